@@ -1,5 +1,5 @@
+import asyncio
 import logging
-import os
 import json
 from fastapi import APIRouter, HTTPException
 from fastapi.encoders import jsonable_encoder
@@ -7,33 +7,39 @@ from fastapi.encoders import jsonable_encoder
 # Setup logging
 logger = logging.getLogger(__name__)
 
-from app.core.config import settings
-from app.services.file_parser import extract_text, extract_dataframe, get_file_extension, SUPPORTED_EXTENSIONS
+from app.services.file_parser import extract_text, extract_dataframe
+from app.services.file_index import find_file_path
 from app.services.analyzer import analyze_document, generate_dashboard
+from app.services.streaming import is_out_of_core, profile_csv
 from app.models.schemas import AnalysisRequest, AnalysisResponse, DashboardResponse
 
 router = APIRouter()
 
 
-def _find_file_path(file_id: str) -> str:
-    for ext in SUPPORTED_EXTENSIONS:
-        path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{ext}")
-        if os.path.exists(path):
-            return path
-        # Fallback to legacy path
-        legacy_path = os.path.join("./uploads", f"{file_id}{ext}")
-        if os.path.exists(legacy_path):
-            return legacy_path
-    raise HTTPException(status_code=404, detail="File not found")
+def _analyze(request: AnalysisRequest) -> AnalysisResponse:
+    file_path = find_file_path(request.file_id)
+    text = extract_text(file_path)
+    df = extract_dataframe(file_path)
+    return analyze_document(request.file_id, text, df, request.custom_prompt, language=request.language)
 
 
+def _dashboard(request: AnalysisRequest) -> DashboardResponse:
+    file_path = find_file_path(request.file_id)
+    if is_out_of_core(file_path):
+        # Too large to load whole: work from streamed aggregates and a reservoir sample
+        profile = profile_csv(file_path)
+        return generate_dashboard(request.file_id, profile.to_text(), profile.sample, language=request.language, profile=profile)
+    text = extract_text(file_path)
+    df = extract_dataframe(file_path)
+    return generate_dashboard(request.file_id, text, df, language=request.language)
+
+
+# Parsing, profiling (a full pass over out-of-core CSVs) and the model calls all run
+# in a worker thread, off the event loop
 @router.post("/analyze", response_model=AnalysisResponse)
 async def analyze(request: AnalysisRequest):
     try:
-        file_path = _find_file_path(request.file_id)
-        text = extract_text(file_path)
-        df = extract_dataframe(file_path)
-        return analyze_document(request.file_id, text, df, request.custom_prompt, language=request.language)
+        return await asyncio.to_thread(_analyze, request)
     except HTTPException:
         raise
     except Exception as e:
@@ -44,10 +50,7 @@ async def analyze(request: AnalysisRequest):
 @router.post("/dashboard", response_model=DashboardResponse)
 async def dashboard(request: AnalysisRequest):
     try:
-        file_path = _find_file_path(request.file_id)
-        text = extract_text(file_path)
-        df = extract_dataframe(file_path)
-        return generate_dashboard(request.file_id, text, df, language=request.language)
+        return await asyncio.to_thread(_dashboard, request)
     except HTTPException:
         raise
     except Exception as e:
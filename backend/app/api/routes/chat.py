@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
-from app.services.chat import chat_with_document, get_chat_sessions, get_chat_session, delete_chat_session
+from app.services.chat_log import is_valid_session_id
+from app.services.chat import chat_with_document, stream_chat, get_chat_sessions, get_chat_session, delete_chat_session
 from app.models.schemas import ChatRequest, ChatResponse, ChatSession
 
 router = APIRouter()
@@ -8,7 +10,7 @@ router = APIRouter()
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
-    return chat_with_document(
+    return await chat_with_document(
         file_id=request.file_id,
         question=request.question,
         chat_history=request.chat_history,
@@ -17,14 +19,34 @@ async def chat(request: ChatRequest):
     )
 
 
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Same turn as /chat, as server-sent events: sources, tokens, tool progress, done."""
+    if request.session_id and not is_valid_session_id(request.session_id):
+        raise HTTPException(status_code=400, detail="Invalid session_id")
+    return StreamingResponse(
+        stream_chat(
+            file_id=request.file_id,
+            question=request.question,
+            chat_history=request.chat_history,
+            session_id=request.session_id,
+            language=request.language,
+        ),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/chat/sessions/{file_id}", response_model=list[ChatSession])
 async def list_sessions(file_id: str):
     return get_chat_sessions(file_id)
 
 
 @router.get("/chat/session/{session_id}", response_model=ChatSession)
-async def get_session(session_id: str):
-    session = get_chat_session(session_id)
+async def get_session(session_id: str, last: int | None = None):
+    """The session with all its messages, or only the last `last` of them."""
+    session = get_chat_session(session_id, last=last)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     return session
@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import APIRouter, HTTPException
 
 from app.services.compare import compare_files
@@ -13,6 +14,6 @@ async def compare(request: CompareRequest):
     if len(request.file_ids) > 5:
         raise HTTPException(status_code=400, detail="Maximum 5 files for comparison")
     try:
-        return compare_files(request.file_ids, request.custom_prompt)
+        return await asyncio.to_thread(compare_files, request.file_ids, request.custom_prompt)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -2,8 +2,9 @@ import os
 import pandas as pd
 from fastapi import APIRouter, HTTPException
 
-from app.core.config import settings
-from app.services.file_parser import SUPPORTED_EXTENSIONS
+from app.services.file_parser import read_csv, extract_dataframe
+from app.services.excel import read_sheet
+from app.services.file_index import find_file_path
 from app.services.forecast import PriceForecaster
 from app.models.schemas import ForecastRequest, ForecastResponse, ForecastDataPoint
 from app.utils.serialization import cleanup_serializable
@@ -11,20 +12,9 @@ from app.utils.serialization import cleanup_serializable
 router = APIRouter()
 
 
-def _find_file_path(file_id: str) -> str:
-    for ext in SUPPORTED_EXTENSIONS:
-        path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{ext}")
-        if os.path.exists(path):
-            return path
-        legacy_path = os.path.join("./uploads", f"{file_id}{ext}")
-        if os.path.exists(legacy_path):
-            return legacy_path
-    raise HTTPException(status_code=404, detail="File not found")
-
-
 @router.post("/forecast", response_model=ForecastResponse)
 async def forecast(request: ForecastRequest):
-    file_path = _find_file_path(request.file_id)
+    file_path = find_file_path(request.file_id)
     
     if not file_path.endswith((".xlsx", ".xls", ".csv")):
         raise HTTPException(
@@ -38,12 +28,9 @@ async def forecast(request: ForecastRequest):
         
         # Check if columns exist (we'll read just the header to be fast)
         if ext == '.csv':
-            try:
-                df_head = pd.read_csv(file_path, nrows=0)
-            except Exception:
-                df_head = pd.read_csv(file_path, encoding='latin1', nrows=0)
+            df_head = read_csv(file_path, nrows=0)
         else:
-            df_head = pd.read_excel(file_path, nrows=0)
+            df_head = read_sheet(file_path, nrows=0)
             
         available_cols = df_head.columns.tolist()
         if request.date_column not in available_cols:
@@ -79,13 +66,9 @@ async def forecast(request: ForecastRequest):
                 logger.warning(f"Modal standalone forecast failed, falling back to local: {e}")
 
         # Local Fallback
-        if ext == '.csv':
-            try:
-                df = pd.read_csv(file_path)
-            except Exception:
-                df = pd.read_csv(file_path, encoding='latin1')
-        else:
-            df = pd.read_excel(file_path)
+        df = extract_dataframe(file_path)
+        if df is None:
+            raise HTTPException(status_code=400, detail="Could not read tabular data from file")
 
         forecaster = PriceForecaster(
             file_path=file_path,
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, HTTPException
+
+from app.services.jobs import get_job
+from app.models.schemas import IngestionJobResponse
+
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_job_status(job_id: str):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return IngestionJobResponse(**job)
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+
+from app.services.llm_gateway import llm_stats
+
+router = APIRouter()
+
+
+@router.get("/llm/stats")
+async def get_llm_stats():
+    """Chat-completion calls, tokens and latency per caller since startup."""
+    return llm_stats()
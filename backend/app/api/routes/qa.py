@@ -1,24 +1,16 @@
 import logging
-import os
 import pandas as pd
 import numpy as np
 from fastapi import APIRouter, HTTPException
 
 logger = logging.getLogger(__name__)
 
-from app.core.config import settings
-from app.services.file_parser import extract_dataframe, get_file_extension, SUPPORTED_EXTENSIONS
+from app.services.file_parser import extract_dataframe
+from app.services.file_index import find_file_path
 from app.models.schemas import AnalysisRequest
 
 router = APIRouter()
 
-def _find_file_path(file_id: str) -> str:
-    for ext in SUPPORTED_EXTENSIONS:
-        path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{ext}")
-        if os.path.exists(path):
-            return path
-    raise HTTPException(status_code=404, detail="File not found")
-
 @router.post("/qa")
 async def check_data_quality(request: AnalysisRequest):
     """
@@ -26,7 +18,7 @@ async def check_data_quality(request: AnalysisRequest):
     If the score is too low, it flags the file for AI Auto-Refinement.
     """
     try:
-        file_path = _find_file_path(request.file_id)
+        file_path = find_file_path(request.file_id)
         df = extract_dataframe(file_path)
         
         if df is None or df.empty:
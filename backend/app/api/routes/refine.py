@@ -1,5 +1,7 @@
 import logging
 import os
+import uuid
+from pathlib import Path
 import pandas as pd
 import numpy as np
 from fastapi import APIRouter, HTTPException
@@ -7,19 +9,19 @@ from fastapi import APIRouter, HTTPException
 logger = logging.getLogger(__name__)
 
 from app.core.config import settings
-from app.services.file_parser import extract_dataframe, get_file_extension, SUPPORTED_EXTENSIONS
+from app.services.file_parser import extract_dataframe, get_file_extension
+from app.core.database import files_table, File
+from app.services.file_index import find_file_path, register_file_path
+from app.services.blobs import detach_blob
 from app.models.schemas import AnalysisRequest
 from app.services.analyzer import refine_dataframe
+from app.services.columnar import write_sidecar
+from app.services.frame_cache import frame_cache
+from app.services.jobs import create_job, submit_reindex
+from app.services.sniffer import reset_reader_config
 
 router = APIRouter()
 
-def _find_file_path(file_id: str) -> str:
-    for ext in SUPPORTED_EXTENSIONS:
-        path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{ext}")
-        if os.path.exists(path):
-            return path
-    raise HTTPException(status_code=404, detail="File not found")
-
 @router.post("/refine")
 async def refine_dataset(request: AnalysisRequest):
     """
@@ -28,7 +30,7 @@ async def refine_dataset(request: AnalysisRequest):
     and saves the clean payload back to disk for the Dashboard engine.
     """
     try:
-        file_path = _find_file_path(request.file_id)
+        file_path = find_file_path(request.file_id)
         df = extract_dataframe(file_path)
         
         if df is None or df.empty:
@@ -44,13 +46,35 @@ async def refine_dataset(request: AnalysisRequest):
 
         print(f"Finished Refinement. Final rows: {len(df_clean)}")
 
-        # 3. Overwrite the file on disk so that the dashboard loads the pristine data
+        # 3. Overwrite the file on disk so that the dashboard loads the pristine data.
+        # A deduplicated blob shared with other uploads gets a private copy instead, at a
+        # new path: the blob may live at this file's own original path
+        shared = detach_blob(request.file_id) or files_table.contains(
+            (File.file_path == file_path) & (File.file_id != request.file_id)
+        )
+        if shared:
+            file_path = os.path.join(
+                settings.UPLOAD_DIR, f"{request.file_id}-{uuid.uuid4().hex[:8]}{get_file_extension(file_path)}"
+            )
+            files_table.update({"file_path": file_path}, File.file_id == request.file_id)
+            register_file_path(request.file_id, file_path)
         df_clean.to_csv(file_path, index=False)
-        
+        # The rewritten file uses pandas' default dialect, whatever the upload used
+        # Artifacts are keyed by the blob's stem, which differs from file_id for an alias
+        reset_reader_config(Path(file_path).stem)
+        frame_cache.invalidate(Path(file_path).stem)
+        write_sidecar(file_path, df_clean)
+
+        # Re-index in the background; only chunks that changed are embedded
+        doc = files_table.get(File.file_id == request.file_id)
+        job = create_job(request.file_id, doc["filename"] if doc else Path(file_path).name)
+        submit_reindex(job)
+
         return {
             "success": True,
             "message": f"Successfully refined dataset. Cleaned {len(df) - len(df_clean)} toxic/duplicate rows.",
             "final_rows": len(df_clean),
+            "reindex_job_id": job["job_id"],
         }
         
     except HTTPException:
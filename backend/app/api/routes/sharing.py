@@ -1,3 +1,4 @@
+import asyncio
 import os
 import uuid
 from datetime import datetime, timezone, timedelta
@@ -5,28 +6,17 @@ from fastapi import APIRouter, HTTPException
 
 from app.core.config import settings
 from app.core.database import shares_table, files_table, Share, File
-from app.services.file_parser import extract_text, extract_dataframe, SUPPORTED_EXTENSIONS
+from app.services.file_parser import extract_text, extract_dataframe
+from app.services.file_index import find_file_path
 from app.services.analyzer import analyze_document, generate_dashboard
 from app.models.schemas import ShareRequest, ShareResponse, SharedReportResponse
 
 router = APIRouter()
 
 
-def _find_file_path(file_id: str) -> str:
-    for ext in SUPPORTED_EXTENSIONS:
-        path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{ext}")
-        if os.path.exists(path):
-            return path
-        # Fallback to legacy path
-        legacy_path = os.path.join("./uploads", f"{file_id}{ext}")
-        if os.path.exists(legacy_path):
-            return legacy_path
-    raise HTTPException(status_code=404, detail="File not found")
-
-
 @router.post("/share", response_model=ShareResponse)
 async def create_share(request: ShareRequest):
-    _find_file_path(request.file_id)  # validate file exists
+    find_file_path(request.file_id)  # validate file exists
 
     share_id = str(uuid.uuid4())[:12]
     now = datetime.now(timezone.utc)
@@ -67,7 +57,7 @@ async def get_shared_report(share_id: str):
         raise HTTPException(status_code=410, detail="This shared link has expired")
 
     file_id = share["file_id"]
-    file_path = _find_file_path(file_id)
+    file_path = find_file_path(file_id)
     text = extract_text(file_path)
     df = extract_dataframe(file_path)
 
@@ -75,10 +65,10 @@ async def get_shared_report(share_id: str):
     dashboard = None
 
     if share.get("include_analysis", True):
-        analysis = analyze_document(file_id, text, df)
+        analysis = await asyncio.to_thread(analyze_document, file_id, text, df)
 
     if share.get("include_dashboard", True):
-        dashboard = generate_dashboard(file_id, text, df)
+        dashboard = await asyncio.to_thread(generate_dashboard, file_id, text, df)
 
     return SharedReportResponse(
         filename=share.get("filename", "document"),
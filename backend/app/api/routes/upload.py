@@ -1,12 +1,22 @@
+import asyncio
+import logging
 from datetime import datetime, timezone
 from fastapi import APIRouter, UploadFile, File, HTTPException
 import os
 
 from app.core.database import files_table, File as FileQ
-from app.services.file_parser import validate_file, save_uploaded_file, extract_text
-from app.services.chunker import chunk_text, create_vectorstore
+from app.services.file_parser import validate_file, save_uploaded_file, extract_text, frame_digest, get_file_extension
+from app.services.columnar import write_sidecar, write_digest
+from app.services.file_index import register_file_path, forget_file_path
+from app.services.blobs import find_blob, add_blob_ref, release_file
+from app.services.jobs import create_job, submit_ingestion
+from app.services.sniffer import get_reader_config, reset_reader_config
+from app.services.chunker import create_vectorstore
+from app.services.table_chunker import table_chunks
 from app.models.schemas import FileUploadResponse, FileRecord
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
@@ -19,91 +29,89 @@ async def upload_file(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail=error)
 
     from app.services.file_parser import save_uploaded_file_stream
-    file_id, file_path = await save_uploaded_file_stream(file, file.filename)
-
+    file_id, file_path, sha256 = await save_uploaded_file_stream(file, file.filename)
+
+    blob = find_blob(sha256, get_file_extension(file_path))
+    if not blob:
+        # Parse, chunk and embed off the event loop; poll /jobs/{job_id} for progress
+        job = create_job(file_id, file.filename)
+        submit_ingestion(job, file_path, sha256)
+        return FileUploadResponse(
+            file_id=file_id,
+            filename=file.filename,
+            file_type=file.filename.rsplit(".", 1)[-1],
+            num_chunks=0,
+            preview="",
+            job_id=job["job_id"],
+            status=job["status"],
+        )
+
+    # Same bytes already ingested: alias the stored blob, sidecars and vectors
+    os.remove(file_path)
+    file_path = blob["file_path"]
     text = extract_text(file_path)
-    if not text.strip():
-        # Clean up failed file
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        raise HTTPException(status_code=400, detail="Could not extract text from file")
-
-    chunks = chunk_text(text)
-    create_vectorstore(file_id, chunks)
 
     # Save file record to database
     files_table.insert({
         "file_id": file_id,
         "filename": file.filename,
         "file_type": file.filename.rsplit(".", 1)[-1],
-        "num_chunks": len(chunks),
+        "num_chunks": blob["num_chunks"],
         "uploaded_at": datetime.now(timezone.utc).isoformat(),
         "file_size": os.path.getsize(file_path),
+        "file_path": file_path,
+        "reader_config": get_reader_config(file_path) if get_file_extension(file_path) == ".csv" else None,
+        "sha256": sha256,
+        "vector_id": blob["vector_id"],
     })
+    add_blob_ref(sha256, file_id, file_path, blob["vector_id"], blob["num_chunks"])
+    register_file_path(file_id, file_path)
 
     return FileUploadResponse(
         file_id=file_id,
         filename=file.filename,
         file_type=file.filename.rsplit(".", 1)[-1],
-        num_chunks=len(chunks),
+        num_chunks=blob["num_chunks"],
         preview=text[:500],
     )
 
 @router.post("/upload-multi", response_model=FileUploadResponse)
 async def upload_multi_files(files: list[UploadFile] = File(...)):
-    import pandas as pd
     import uuid
     import os
-    from app.services.file_parser import get_file_extension, save_uploaded_file_stream
+    from app.services.file_parser import save_uploaded_file_stream
+    from app.services.merge import parse_tables, merge_tables, MergeTooLargeError
     from app.core.config import settings
 
     if len(files) < 2:
         raise HTTPException(status_code=400, detail="Please upload at least 2 files to merge")
     
-    dfs = []
     temp_files = []
+    names = []
     for _file in files:
         file_size = _file.size if hasattr(_file, 'size') and _file.size is not None else 0
         valid, error = validate_file(_file.filename, file_size)
         if not valid:
             raise HTTPException(status_code=400, detail=f"{_file.filename}: {error}")
             
-        file_id, file_path = await save_uploaded_file_stream(_file, _file.filename)
+        file_id, file_path, _ = await save_uploaded_file_stream(_file, _file.filename)
         temp_files.append(file_path)
-        
-        ext = get_file_extension(_file.filename)
-        try:
-            if ext == ".csv":
-                try:
-                    df = pd.read_csv(file_path)
-                except UnicodeDecodeError:
-                    df = pd.read_csv(file_path, encoding='latin1')
-            elif ext in (".xlsx", ".xls"):
-                try:
-                    df = pd.read_excel(file_path)
-                except Exception:
-                    try:
-                        df = pd.read_excel(file_path, engine='openpyxl')
-                    except Exception:
-                        df = pd.read_excel(file_path, engine='xlrd')
-            else:
-                continue # Skip non-tabular 
-            dfs.append(df)
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Error reading {_file.filename}: {str(e)}")
-            
-    if not dfs:
+        names.append(_file.filename)
+
+    # Parse every file at once; non-tabular files come back as None and are skipped
+    try:
+        parsed = await asyncio.to_thread(parse_tables, temp_files)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error reading uploaded files: {str(e)}")
+    tables = [(df, name) for df, name in zip(parsed, names) if df is not None]
+    if not tables:
         raise HTTPException(status_code=400, detail="No valid tabular data found to merge")
-        
-    common_cols = list(set.intersection(*[set(df.columns) for df in dfs]))
-    if common_cols and len(common_cols) > 0 and len(common_cols) < len(dfs[0].columns):
-        merged_df = dfs[0]
-        for df in dfs[1:]:
-            merged_df = pd.merge(merged_df, df, on=common_cols[0], how='outer', suffixes=('', '_dup'))
-    else:
-        merged_df = pd.concat(dfs, axis=1)
-        
-    merged_df = merged_df.loc[:,~merged_df.columns.duplicated()]
+    dfs, names = [df for df, _ in tables], [name for _, name in tables]
+
+    try:
+        merged_df, plan = await asyncio.to_thread(merge_tables, dfs, names)
+    except MergeTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
     merged_id = f"merged_{uuid.uuid4().hex[:8]}"
     merged_filename = f"merged_dataset_{len(files)}.csv"
@@ -135,11 +143,11 @@ async def upload_multi_files(files: list[UploadFile] = File(...)):
             logger.warning(f"Modal merge failed, using local: {e}")
 
     merged_df.to_csv(merged_path, index=False)
-    
-    text = extract_text(merged_path)
-    if not text.strip():
-        text = "Merged Dataset"
-    chunks = chunk_text(text)
+    reset_reader_config(merged_id)
+    write_sidecar(merged_path, merged_df)
+    text = frame_digest(merged_df)
+    write_digest(merged_path, text)
+    chunks = table_chunks(merged_df, merged_filename)
     create_vectorstore(merged_id, chunks)
 
     file_size = os.path.getsize(merged_path)
@@ -151,7 +159,11 @@ async def upload_multi_files(files: list[UploadFile] = File(...)):
         "num_chunks": len(chunks),
         "uploaded_at": datetime.now(timezone.utc).isoformat(),
         "file_size": file_size,
+        "file_path": merged_path,
+        "reader_config": get_reader_config(merged_path),
+        "vector_id": merged_id,
     })
+    register_file_path(merged_id, merged_path)
 
     return FileUploadResponse(
         file_id=merged_id,
@@ -159,6 +171,8 @@ async def upload_multi_files(files: list[UploadFile] = File(...)):
         file_type="csv",
         num_chunks=len(chunks),
         preview=text[:500],
+        merge_strategy=plan.strategy,
+        merge_keys=plan.keys,
     )
 
 
@@ -173,7 +187,11 @@ async def list_files():
 
 @router.delete("/files/{file_id}")
 async def delete_file(file_id: str):
-    removed = files_table.remove(FileQ.file_id == file_id)
-    if not removed:
+    doc = files_table.get(FileQ.file_id == file_id)
+    if not doc:
         raise HTTPException(status_code=404, detail="File not found")
+    files_table.remove(FileQ.file_id == file_id)
+    forget_file_path(file_id)
+    # Deduplicated blobs and vectors are only removed once no other file references them
+    release_file(doc)
     return {"status": "deleted"}
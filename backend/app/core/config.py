@@ -8,7 +8,56 @@ class Settings:
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "./.storage/uploads")
     VECTORSTORE_DIR: str = os.getenv("VECTORSTORE_DIR", "./.storage/vectorstore")
+    COLUMNAR_DIR: str = os.getenv("COLUMNAR_DIR", "./.storage/columnar")
+    EMBEDDING_CACHE_DIR: str = os.getenv("EMBEDDING_CACHE_DIR", "./.storage/embedding_cache")
+    PAGE_CACHE_DIR: str = os.getenv("PAGE_CACHE_DIR", "./.storage/page_cache")
+    LEXICAL_INDEX_DIR: str = os.getenv("LEXICAL_INDEX_DIR", "./.storage/lexical")
+    CHAT_LOG_DIR: str = os.getenv("CHAT_LOG_DIR", "./.storage/chat_logs")
     MAX_FILE_SIZE_MB: int = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
+    FRAME_CACHE_MAX_MB: int = int(os.getenv("FRAME_CACHE_MAX_MB", "512"))
+    # CSVs above this size are profiled in chunks instead of loaded whole
+    OUT_OF_CORE_THRESHOLD_MB: int = int(os.getenv("OUT_OF_CORE_THRESHOLD_MB", "200"))
+    STREAM_CHUNK_ROWS: int = int(os.getenv("STREAM_CHUNK_ROWS", "100000"))
+    DIGEST_SAMPLE_ROWS: int = int(os.getenv("DIGEST_SAMPLE_ROWS", "50"))
+    RESERVOIR_SAMPLE_ROWS: int = int(os.getenv("RESERVOIR_SAMPLE_ROWS", "20000"))
+    EXCEL_SHEET_WORKERS: int = int(os.getenv("EXCEL_SHEET_WORKERS", "4"))
+    PDF_WORKERS: int = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+    OCR_WORKERS: int = int(os.getenv("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+    OCR_BASE_DPI: int = int(os.getenv("OCR_BASE_DPI", "150"))
+    OCR_MAX_DPI: int = int(os.getenv("OCR_MAX_DPI", "300"))
+    OCR_MIN_CONFIDENCE: float = float(os.getenv("OCR_MIN_CONFIDENCE", "70"))
+    # "per_file": one Chroma directory per upload; "shared": one collection filtered by file_id
+    VECTORSTORE_MODE: str = os.getenv("VECTORSTORE_MODE", "per_file")
+    # "chroma", or "numpy": in-process memory-mapped matrix stored as VECTORSTORE_DTYPE ("float16" or "int8")
+    VECTORSTORE_BACKEND: str = os.getenv("VECTORSTORE_BACKEND", "chroma")
+    VECTORSTORE_DTYPE: str = os.getenv("VECTORSTORE_DTYPE", "float16")
+    VECTORSTORE_POOL_SIZE: int = int(os.getenv("VECTORSTORE_POOL_SIZE", "64"))
+    VECTORSTORE_POOL_IDLE_SECONDS: float = float(os.getenv("VECTORSTORE_POOL_IDLE_SECONDS", "900"))
+    # "hybrid": BM25 + vector search; "vector": vector only; "lexical": BM25 only, no embedding calls
+    RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "hybrid")
+    # Hybrid search skips the query embedding when the top BM25 hit beats the runner-up by this factor
+    HYBRID_DECISIVE_MARGIN: float = float(os.getenv("HYBRID_DECISIVE_MARGIN", "2.0"))
+    QUERY_EMBEDDING_CACHE_SIZE: int = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+    RETRIEVAL_CACHE_SIZE: int = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+    # Chat forecast tool: fitted models per (file content, columns), outputs per (file content, columns, months)
+    FORECAST_MODEL_CACHE_SIZE: int = int(os.getenv("FORECAST_MODEL_CACHE_SIZE", "16"))
+    FORECAST_CACHE_SIZE: int = int(os.getenv("FORECAST_CACHE_SIZE", "256"))
+    # Chat session headers kept in memory, so a turn does not re-read the TinyDB file
+    CHAT_SESSION_CACHE_SIZE: int = int(os.getenv("CHAT_SESSION_CACHE_SIZE", "4096"))
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", "2"))
+    EMBED_WORKERS: int = int(os.getenv("EMBED_WORKERS", "4"))
+    # Embedding requests are packed up to this many (estimated) tokens / chunks
+    EMBED_BATCH_TOKENS: int = int(os.getenv("EMBED_BATCH_TOKENS", "100000"))
+    EMBED_BATCH_MAX_CHUNKS: int = int(os.getenv("EMBED_BATCH_MAX_CHUNKS", "512"))
+    EMBED_MAX_RETRIES: int = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+    MERGE_PARSE_WORKERS: int = int(os.getenv("MERGE_PARSE_WORKERS", "4"))
+    # /upload-multi refuses merges whose estimated output exceeds either limit
+    MERGE_MAX_ROWS: int = int(os.getenv("MERGE_MAX_ROWS", "5000000"))
+    MERGE_MAX_MB: int = int(os.getenv("MERGE_MAX_MB", "1024"))
+    # Chat-completion calls in flight at once across all requests (see services/llm_gateway.py)
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
     ALLOWED_ORIGINS: list[str] = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
@@ -19,8 +19,9 @@ app_logger.setLevel(logging.DEBUG)
 app_logger.info("Backend application starting...")
 
 from app.core.config import settings
-from app.api.routes import upload, analysis, chat, export, compare, cleaning, sharing, language, email_report, apikeys, forecast, causal, qa, refine, auth
+from app.api.routes import upload, analysis, chat, export, compare, cleaning, sharing, language, email_report, apikeys, forecast, causal, qa, refine, auth, jobs, llm
 from app.core.security import verify_token
+from app.services.file_index import warm_file_index
 from fastapi import Depends
 
 app = FastAPI(
@@ -29,6 +30,10 @@ app = FastAPI(
     version="1.0.0",
 )
 
+@app.on_event("startup")
+async def warm_indexes():
+    app_logger.info(f"File index warmed with {warm_file_index()} entries")
+
 # Exception handlers... (already there, but I'll keep context)
 
 @app.exception_handler(HTTPException)
@@ -60,6 +65,7 @@ app.include_router(auth.router, prefix="/api", tags=["Auth"])
 # 2. Protected Data Routes
 protected = [Depends(verify_token)]
 app.include_router(upload.router, prefix="/api", tags=["Upload"], dependencies=protected)
+app.include_router(jobs.router, prefix="/api", tags=["Upload"], dependencies=protected)
 app.include_router(analysis.router, prefix="/api", tags=["Analysis"], dependencies=protected)
 app.include_router(chat.router, prefix="/api", tags=["Chat"], dependencies=protected)
 app.include_router(export.router, prefix="/api", tags=["Export"], dependencies=protected)
@@ -68,6 +74,7 @@ app.include_router(cleaning.router, prefix="/api", tags=["Cleaning"], dependenci
 app.include_router(language.router, prefix="/api", tags=["Language"], dependencies=protected)
 app.include_router(email_report.router, prefix="/api", tags=["Email"], dependencies=protected)
 app.include_router(apikeys.router, prefix="/api", tags=["Settings"], dependencies=protected)
+app.include_router(llm.router, prefix="/api", tags=["Settings"], dependencies=protected)
 app.include_router(forecast.router, prefix="/api", tags=["Forecasting"], dependencies=protected)
 app.include_router(causal.router, prefix="/api", tags=["Causal"], dependencies=protected)
 app.include_router(qa.router, prefix="/api", tags=["Quality"], dependencies=protected)
@@ -9,6 +9,31 @@ class FileUploadResponse(BaseModel):
     file_type: str
     num_chunks: int
     preview: str
+    job_id: str | None = None
+    status: str = "completed"
+    # /upload-multi only: "stack" (identical columns: rows appended), "join" on merge_keys, or "side_by_side"
+    merge_strategy: str | None = None
+    merge_keys: list[str] | None = None
+
+
+class JobStage(BaseModel):
+    status: str
+    done: int
+    total: int | None = None
+
+
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    file_id: str
+    filename: str
+    status: str
+    stages: dict[str, JobStage]
+    num_chunks: int
+    preview: str
+    embedding_cache_hit_rate: float | None = None
+    error: str | None = None
+    created_at: str
+    updated_at: str
 
 
 # --- Analysis ---
@@ -1,5 +1,4 @@
 import json
-from openai import OpenAI
 import pandas as pd
 import numpy as np
 import io
@@ -53,14 +52,9 @@ import hdbscan
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from app.services.language import detect_language, get_analysis_system_prompt
 from app.services.forecast import PriceForecaster
+from app.services.streaming import TabularProfile
 from app.utils.modal import get_modal_func
-
-
-def _get_client(api_key: str | None = None) -> OpenAI:
-    return OpenAI(api_key=api_key or settings.OPENAI_API_KEY)
-
-
-client = _get_client()
+from app.services import llm_gateway
 
 
 def refine_dataframe(df: pd.DataFrame) -> pd.DataFrame:
@@ -161,9 +155,10 @@ Respond in this exact JSON format:
         lang_code, _ = detect_language(text)
     
     system_prompt = get_analysis_system_prompt(lang_code)
-    ai_client = _get_client(api_key) if api_key else client
 
-    response = ai_client.chat.completions.create(
+    response = llm_gateway.complete(
+        caller="analysis",
+        api_key=api_key,
         model=settings.ANALYSIS_MODEL,
         messages=[
             {"role": "system", "content": system_prompt},
@@ -197,12 +192,14 @@ Respond in this exact JSON format:
     )
 
 
-def calculate_correlations(df: pd.DataFrame) -> list[CorrelationMetric]:
-    numeric_df = df.select_dtypes(include=[np.number])
-    if numeric_df.shape[1] < 2:
+def calculate_correlations(df: pd.DataFrame, corr_matrix: pd.DataFrame | None = None) -> list[CorrelationMetric]:
+    if corr_matrix is None:
+        numeric_df = df.select_dtypes(include=[np.number])
+        if numeric_df.shape[1] < 2:
+            return []
+        corr_matrix = numeric_df.corr()
+    elif corr_matrix.shape[1] < 2:
         return []
-
-    corr_matrix = numeric_df.corr()
     metrics = []
 
     # Get top correlations, avoiding self-correlation and duplicates
@@ -271,17 +268,28 @@ def detect_anomalies(df: pd.DataFrame) -> list[AnomalyAlert]:
 
     return alerts[:10]
 
-def calculate_data_quality(df: pd.DataFrame) -> DataQualityReport:
-    total_cells = df.size
-    missing_cells = df.isnull().sum().sum()
+def calculate_data_quality(df: pd.DataFrame, profile: TabularProfile | None = None) -> DataQualityReport:
+    numeric_df = df.select_dtypes(include=[np.number])
+    if profile is not None:
+        # df is a refined sample: numeric columns have been imputed, so only the
+        # remaining non-numeric columns contribute missing cells, counted exactly
+        total_cells = profile.row_count * len(df.columns)
+        missing_cells = sum(profile.null_counts.get(str(col), 0) for col in df.columns if col not in numeric_df.columns)
+    else:
+        total_cells = df.size
+        missing_cells = df.isnull().sum().sum()
     missing_pct = (missing_cells / total_cells * 100) if total_cells > 0 else 0
 
+    # Duplicates are estimated from the sample when profiling out-of-core
     duplicates = df.duplicated().sum()
     duplicate_pct = (duplicates / len(df) * 100) if len(df) > 0 else 0
 
     # Simple variance health (check if numeric columns have 0 variance)
-    numeric_df = df.select_dtypes(include=[np.number])
-    zero_variance_cols = [col for col in numeric_df.columns if numeric_df[col].std() == 0]
+    def _variance(col):
+        exact = profile.variance(str(col)) if profile is not None else None
+        return exact if exact is not None else numeric_df[col].var()
+
+    zero_variance_cols = [col for col in numeric_df.columns if _variance(col) == 0]
 
     # Scoring logic: Start at 100, deduct for missing data and duplicates
     score = 100 - (missing_pct * 0.5) - (duplicate_pct * 0.3)
@@ -296,7 +304,7 @@ def calculate_data_quality(df: pd.DataFrame) -> DataQualityReport:
     if zero_variance_cols: issues.append(f"Zero variance in column: {zero_variance_cols[0]}")
 
     try:
-        var_score = safe_float(numeric_df.var().mean(), default=0.0)
+        var_score = safe_float(pd.Series([_variance(col) for col in numeric_df.columns], dtype=float).mean(), default=0.0)
     except Exception:
         var_score = 0.0
 
@@ -374,8 +382,8 @@ def classify_segments(df: pd.DataFrame, file_id: str = None) -> list[DataSegment
             from app.utils.modal import sync_file_to_modal
             file_ext = ".csv"
             # Find actual file path if file_id exists
-            from app.services.chat import _find_file_path
-            f_path = _find_file_path(file_id) if file_id else None
+            from app.services.file_index import resolve_file_path
+            f_path = resolve_file_path(file_id) if file_id else None
             
             if f_path and sync_file_to_modal(file_id, f_path):
                 logger.info(f"Offloading segmentation to Modal (via Volume: {file_id})...")
@@ -460,8 +468,8 @@ Return JSON:
 }}"""
 
     try:
-        ai_client = _get_client(settings.OPENAI_API_KEY)
-        response = ai_client.chat.completions.create(
+        response = llm_gateway.complete(
+            caller="segments",
             model=settings.ANALYSIS_MODEL,
             messages=[
                 {"role": "system", "content": "You are a business strategist specializing in market segmentation. Return valid JSON only."},
@@ -498,7 +506,21 @@ Return JSON:
         return final_segments
 
 
-def generate_dashboard(file_id: str, text: str, df: pd.DataFrame | None = None, language: str | None = None) -> DashboardResponse:
+def _column_total(df: pd.DataFrame, col: str, profile: TabularProfile | None = None) -> float:
+    """Column sum; exact from the profile when available, otherwise scaled up from the sample."""
+    if profile is None:
+        return safe_float(df[col].sum())
+    if str(col) in profile.sums:
+        return safe_float(profile.sums[str(col)])
+    return safe_float(df[col].sum()) * profile.row_count / max(len(df), 1)
+
+
+def generate_dashboard(file_id: str, text: str, df: pd.DataFrame | None = None, language: str | None = None, profile: TabularProfile | None = None) -> DashboardResponse:
+    """Build the dashboard for a file.
+
+    For out-of-core files, df is the reservoir sample and profile carries the
+    exact aggregates used for totals, missing values and correlations.
+    """
     try:
         if df is not None:
             df = refine_dataframe(df)
@@ -523,15 +545,15 @@ def generate_dashboard(file_id: str, text: str, df: pd.DataFrame | None = None,
                 future_audit = None
                 modal_audit_run = get_modal_func("run_data_audit")
                 if modal_audit_run:
-                    from app.services.chat import _find_file_path
+                    from app.services.file_index import resolve_file_path
                     from app.utils.modal import sync_file_to_modal
-                    f_path = _find_file_path(file_id)
+                    f_path = resolve_file_path(file_id)
                     if f_path and sync_file_to_modal(file_id, f_path):
                         logger.info("Parallelizing data audit (Modal)...")
                         future_audit = executor.submit(modal_audit_run.remote, file_id, os.path.splitext(f_path)[1].lower())
 
                 logger.info("Parallelizing correlations, feature importance, and segments...")
-                future_corr = executor.submit(calculate_correlations, df)
+                future_corr = executor.submit(calculate_correlations, df, profile.correlation_matrix() if profile else None)
                 future_feat = executor.submit(calculate_feature_importance, df)
                 future_segments = executor.submit(classify_segments, df, file_id=file_id)
                 
@@ -555,9 +577,9 @@ def generate_dashboard(file_id: str, text: str, df: pd.DataFrame | None = None,
                             try:
                                 m_forecast = get_modal_func("run_forecast")
                                 if m_forecast:
-                                    from app.services.chat import _find_file_path
+                                    from app.services.file_index import resolve_file_path
                                     from app.utils.modal import sync_file_to_modal
-                                    fp = _find_file_path(f_id)
+                                    fp = resolve_file_path(f_id)
                                     if fp and sync_file_to_modal(f_id, fp):
                                         r = m_forecast.remote(file_id=f_id, file_ext=os.path.splitext(fp)[1].lower(), date_col=d_col, value_col=v_col)
                                         return r["forecast"], r["decomposition"]
@@ -581,7 +603,7 @@ def generate_dashboard(file_id: str, text: str, df: pd.DataFrame | None = None,
                     except Exception as e:
                         logger.error(f"Modal audit failed: {e}")
                 
-                if not data_quality: data_quality = calculate_data_quality(df)
+                if not data_quality: data_quality = calculate_data_quality(df, profile=profile)
                 if not anomalies: anomalies = detect_anomalies(df)
                     
                 correlations = future_corr.result()
@@ -597,7 +619,7 @@ def generate_dashboard(file_id: str, text: str, df: pd.DataFrame | None = None,
                         logger.error(f"Forecasting failed: {e}")
 
             # --- Summary Stat & Profile Setup ---
-            row_count = len(df)
+            row_count = profile.row_count if profile else len(df)
             profile_parts = [("High-Volume" if row_count > 100 else "Micro-Dataset")]
             quality_score = data_quality.score if data_quality else 100.0
             profile_parts.append("Unrefined" if (quality_score < 80 or len(anomalies) > (row_count * 0.05)) else "Refined")
@@ -609,6 +631,8 @@ def generate_dashboard(file_id: str, text: str, df: pd.DataFrame | None = None,
                 "numeric_columns": df.select_dtypes(include="number").columns.tolist(),
                 "categorical_columns": df.select_dtypes(include="object").columns.tolist(),
             }
+            if profile:
+                summary_stats["sampled_rows"] = len(df)
 
             # --- P&L Calculation (Robust) ---
             import re
@@ -619,7 +643,7 @@ def generate_dashboard(file_id: str, text: str, df: pd.DataFrame | None = None,
             cost_c = next((c for c in df.columns if any(re.search(p, str(c), re.I) for p in cost_patterns)), None)
             if rev_c and cost_c:
                 try:
-                    total_rev = safe_float(df[rev_c].sum()); total_cost = safe_float(df[cost_c].sum())
+                    total_rev = _column_total(df, rev_c, profile); total_cost = _column_total(df, cost_c, profile)
                     net_profit = total_rev - total_cost
                     margin = (net_profit / total_rev * 100) if total_rev != 0 else 0
                     profit_loss = ProfitLossData(total_revenue=round(total_rev, 2), total_cost=round(total_cost, 2), net_profit=round(net_profit, 2), margin_percentage=round(safe_float(margin), 2))
@@ -645,8 +669,7 @@ def generate_dashboard(file_id: str, text: str, df: pd.DataFrame | None = None,
             try:
                 m_agent = get_modal_func("run_agent_analysis")
                 if m_agent: return name, m_agent.remote(cfg_item['role'], cfg_item['focus'], prompt_data)
-                ai_c = _get_client(settings.OPENAI_API_KEY)
-                r = ai_c.chat.completions.create(model=settings.ANALYSIS_MODEL, messages=[{"role": "system", "content": f"You are the {cfg_item['role']}. {cfg_item['focus']}"}, {"role": "user", "content": f"Data:\n{prompt_data}"}], temperature=0.4)
+                r = llm_gateway.complete(caller=f"dashboard.{name}", model=settings.ANALYSIS_MODEL, messages=[{"role": "system", "content": f"You are the {cfg_item['role']}. {cfg_item['focus']}"}, {"role": "user", "content": f"Data:\n{prompt_data}"}], temperature=0.4)
                 return name, r.choices[0].message.content
             except Exception: return name, "Analysis unavailable."
 
@@ -663,7 +686,8 @@ def generate_dashboard(file_id: str, text: str, df: pd.DataFrame | None = None,
         system_prompt = "You are the Executive Synthesizer AI. Return valid JSON only."
 
         try:
-            response = client.chat.completions.create(
+            response = llm_gateway.complete(
+                caller="dashboard.synthesis",
                 model=settings.ANALYSIS_MODEL,
                 messages=[
                     {"role": "system", "content": system_prompt},
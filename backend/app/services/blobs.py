@@ -0,0 +1,111 @@
+"""Content-addressed upload blobs.
+
+Uploads are hashed while they stream to disk. A file whose SHA-256 already
+exists becomes an alias: its record points at the existing blob path (so the
+columnar sidecar, digest and reader config keyed by that path are shared) and
+at the existing vectorstore through "vector_id". Each blob lists the file_ids
+referencing it, so deleting one alias only removes artifacts nobody else uses.
+"""
+
+import logging
+import os
+import threading
+
+from tinydb import Query
+
+from app.core.database import db, files_table, File
+from app.services.columnar import remove_sidecar
+
+logger = logging.getLogger(__name__)
+
+blobs_table = db.table("blobs")
+Blob = Query()
+
+_lock = threading.Lock()
+
+
+def find_blob(sha256: str, ext: str) -> dict | None:
+    """The live blob with this content and extension, if any."""
+    blob = blobs_table.get(Blob.sha256 == sha256)
+    if not blob or not os.path.exists(blob["file_path"]):
+        return None
+    if os.path.splitext(blob["file_path"])[1].lower() != ext:
+        return None
+    return blob
+
+
+def add_blob_ref(sha256: str, file_id: str, file_path: str, vector_id: str, num_chunks: int) -> dict:
+    """Reference the blob for sha256 from file_id, creating it from file_path if new.
+
+    Returns the blob. If one already existed (an identical upload that finished
+    ingesting first), file_id now references *its* file_path and vector_id, and
+    the caller must point the file record at those, not at its own copy.
+    """
+    with _lock:
+        blob = blobs_table.get(Blob.sha256 == sha256)
+        if blob is None:
+            blob = {
+                "sha256": sha256,
+                "file_path": file_path,
+                "vector_id": vector_id,
+                "num_chunks": num_chunks,
+                "refs": [file_id],
+            }
+            blobs_table.insert(blob)
+        elif file_id not in blob["refs"]:
+            blob = {**blob, "refs": blob["refs"] + [file_id]}
+            blobs_table.update({"refs": blob["refs"]}, Blob.sha256 == sha256)
+        return blob
+
+
+def _drop_ref(sha256: str, file_id: str) -> bool:
+    """Remove file_id from the blob's refs. Returns True if other files still reference it."""
+    with _lock:
+        blob = blobs_table.get(Blob.sha256 == sha256)
+        if blob is None:
+            return False
+        refs = [r for r in blob["refs"] if r != file_id]
+        if refs:
+            blobs_table.update({"refs": refs}, Blob.sha256 == sha256)
+            return True
+        blobs_table.remove(Blob.sha256 == sha256)
+        return False
+
+
+def detach_blob(file_id: str) -> bool:
+    """Drop file_id's reference to its blob. Returns True if other files still use the blob.
+
+    Call before modifying a file in place: a shared blob must be copied first, and
+    an unshared one no longer matches its hash, so it leaves the dedup index.
+    """
+    doc = files_table.get(File.file_id == file_id)
+    sha256 = doc.get("sha256") if doc else None
+    if not sha256:
+        return False
+    files_table.update({"sha256": None}, File.file_id == file_id)
+    return _drop_ref(sha256, file_id)
+
+
+def resolve_vector_id(file_id: str) -> str:
+    """The vectorstore a file reads from; aliases share their original's."""
+    doc = files_table.get(File.file_id == file_id)
+    return (doc or {}).get("vector_id") or file_id
+
+
+def release_file(doc: dict) -> None:
+    """Remove the artifacts of a deleted file record that no remaining record uses."""
+    file_path = doc.get("file_path")
+    shared = _drop_ref(doc["sha256"], doc["file_id"]) if doc.get("sha256") else False
+    if file_path and not shared and not files_table.contains(File.file_path == file_path):
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        remove_sidecar(file_path)
+
+    vector_id = doc.get("vector_id") or doc["file_id"]
+    still_used = files_table.contains(File.vector_id == vector_id) or files_table.contains(
+        (File.file_id == vector_id) & ~File.vector_id.exists()
+    )
+    if not still_used:
+        from app.services.chunker import delete_vectors
+        delete_vectors(vector_id)
+    logger.info(f"Released file {doc['file_id']} (blob shared: {shared}, vectors kept: {still_used})")
@@ -1,42 +1,84 @@
+import asyncio
 import uuid
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from datetime import datetime, timezone
-from openai import OpenAI
 from fastapi import HTTPException
+from tinydb.operations import delete
 
 from app.core.config import settings
 from app.core.database import chats_table, Chat
-from app.services.chunker import load_vectorstore
+from app.services import llm_gateway
+from app.services.chat_log import append_messages, delete_log, is_valid_session_id, log_updated_at, read_messages
+from app.services.chunker import retrieve
 from app.services.language import detect_language, get_chat_system_prompt
 from app.models.schemas import ChatResponse, ChatSession
 from app.services.forecast import PriceForecaster
-from app.services.file_parser import SUPPORTED_EXTENSIONS
+from app.services.file_index import resolve_file_path
+from app.services.retrieval_cache import LRUCache
+from app.utils.hashing import file_sha256
 import logging
 logger = logging.getLogger(__name__)
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
 
-def _find_file_path(file_id: str) -> str:
-    for ext in SUPPORTED_EXTENSIONS:
-        path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{ext}")
-        if os.path.exists(path):
-            return path
-        legacy_path = os.path.join("./uploads", f"{file_id}{ext}")
-        if os.path.exists(legacy_path):
-            return legacy_path
-    return None
+TOOL_PROGRESS_SECONDS = 1.0
+HISTORY_MESSAGES = 10  # earlier messages sent to the model with each question
+_tool_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="chat-tool")
+
+# The same forecast is asked for again and again, from any session: fitted models are kept per
+# (content hash, date column, price column), so a new horizon only predicts; outputs per (..., months)
+_forecast_models = LRUCache(settings.FORECAST_MODEL_CACHE_SIZE)
+_forecasts = LRUCache(settings.FORECAST_CACHE_SIZE)
+_fit_locks: dict[tuple, threading.Lock] = {}
+_fit_locks_lock = threading.Lock()
+
+# Session records by session_id, filled on first read or on create and dropped on delete
+_session_headers = LRUCache(settings.CHAT_SESSION_CACHE_SIZE)
+
+
+def _fitted_forecaster(model_key: tuple, file_path: str, date_column: str, price_column: str):
+    """(forecaster, metrics, lock) for model_key, fitting it once even under concurrent requests."""
+    fitted = _forecast_models.get(model_key)
+    if fitted:
+        return fitted
+    with _fit_locks_lock:
+        fit_lock = _fit_locks.setdefault(model_key, threading.Lock())
+    with fit_lock:
+        fitted = _forecast_models.get(model_key)
+        if fitted:
+            return fitted
+        forecaster = PriceForecaster(
+            file_path=file_path,
+            date_column=date_column,
+            price_column=price_column
+        )
+        forecaster.load_data()
+        metrics = forecaster.train_model()
+        fitted = (forecaster, metrics, threading.Lock())
+        if "Error" not in metrics:
+            _forecast_models.put(model_key, fitted)
+    with _fit_locks_lock:
+        _fit_locks.pop(model_key, None)
+    return fitted
+
 
 def generate_forecast(file_id: str, date_column: str = "Date", price_column: str = "Price", months: int = 3):
     """
     Generate a price forecast for a given file.
     """
-    file_path = _find_file_path(file_id)
+    file_path = resolve_file_path(file_id)
     if not file_path:
         return {"error": "File not found"}
 
     try:
         ext = os.path.splitext(file_path)[1].lower()
+        model_key = (file_sha256(file_path), date_column, price_column)
+        cached = _forecasts.get((*model_key, months))
+        if cached:
+            return cached
         
         # --- Modal Remote Execution Hook ---
         from app.utils.modal import get_modal_func
@@ -64,22 +106,19 @@ def generate_forecast(file_id: str, date_column: str = "Date", price_column: str
                         value_col=price_column,
                         file_content=file_content
                     )
-                return {
+                result = {
                     "forecast": remote_result["forecast"],
                     "metrics": remote_result["metrics"]
                 }
+                _forecasts.put((*model_key, months), result)
+                return result
             except Exception as e:
                 logger.warning(f"Modal chat forecast failed, falling back to local: {e}")
 
         # Local Fallback
-        forecaster = PriceForecaster(
-            file_path=file_path,
-            date_column=date_column,
-            price_column=price_column
-        )
-        forecaster.load_data()
-        metrics = forecaster.train_model()
-        forecast_df = forecaster.predict_next_months(months)
+        forecaster, metrics, predict_lock = _fitted_forecaster(model_key, file_path, date_column, price_column)
+        with predict_lock:
+            forecast_df = forecaster.predict_next_months(months)
         
         forecast_data = []
         for _, row in forecast_df.iterrows():
@@ -92,10 +131,12 @@ def generate_forecast(file_id: str, date_column: str = "Date", price_column: str
                 "price": round(float(row["Predicted_Price"]), 2)
             })
             
-        return {
+        result = {
             "forecast": forecast_data,
             "metrics": metrics
         }
+        _forecasts.put((*model_key, months), result)
+        return result
     except Exception as e:
         return {"error": str(e)}
 
@@ -126,18 +167,19 @@ TOOLS = [
     }
 ]
 
-def chat_with_document(
-    file_id: str, question: str, chat_history: list[dict], session_id: str | None = None, language: str | None = None
-) -> ChatResponse:
+def _prepare_chat(
+    file_id: str, question: str, chat_history: list[dict], session_id: str | None, language: str | None
+) -> tuple[str, list[dict], list[dict], list[str]]:
+    """Load the session and retrieve context. Returns (session_id, chat_history, messages, context_chunks)."""
     if session_id:
-        session_doc = chats_table.get(Chat.session_id == session_id)
+        _check_session_id(session_id)
+        session_doc = _session_header(session_id)
         if session_doc:
-            chat_history = session_doc.get("messages", [])
+            chat_history = _session_messages(session_doc, last=HISTORY_MESSAGES)
     else:
         session_id = str(uuid.uuid4())
 
-    vectorstore = load_vectorstore(file_id)
-    results = vectorstore.similarity_search(question, k=4)
+    results = retrieve(file_id, question, k=4)
     context_chunks = [doc.page_content for doc in results]
     context = "\n\n---\n\n".join(context_chunks)
 
@@ -150,11 +192,104 @@ def chat_with_document(
     system_content += "\n\nYou have access to tools. If the user asks for a forecast or prediction, use the 'generate_forecast' tool. Always mention you are using the forecasting model."
 
     messages = [{"role": "system", "content": system_content}]
-    for entry in chat_history[-10:]:
+    for entry in chat_history[-HISTORY_MESSAGES:]:
         messages.append({"role": entry["role"], "content": entry["content"]})
     messages.append({"role": "user", "content": question})
+    return session_id, chat_history, messages, context_chunks
+
+
+def _sources(context_chunks: list[str]) -> list[str]:
+    return [chunk[:200] + "..." for chunk in context_chunks]
+
 
-    response = client.chat.completions.create(
+def _tool_call_message(content: str | None, tool_calls: list[dict]) -> dict:
+    return {"role": "assistant", "content": content, "tool_calls": tool_calls}
+
+
+def _run_tool(file_id: str, tool_call: dict) -> dict | None:
+    """Execute one tool call; returns the tool message to send back, or None for unknown tools."""
+    function_name = tool_call["function"]["name"]
+    function_args = json.loads(tool_call["function"]["arguments"] or "{}")
+
+    if function_name == "generate_forecast":
+        tool_result = generate_forecast(
+            file_id=file_id,
+            date_column=function_args.get("date_column", "Date"),
+            price_column=function_args.get("price_column", "Price"),
+            months=function_args.get("months", 3)
+        )
+        return {
+            "tool_call_id": tool_call["id"],
+            "role": "tool",
+            "name": function_name,
+            "content": json.dumps(tool_result),
+        }
+    return None
+
+
+def _check_session_id(session_id: str) -> None:
+    # The id names the session's log files, so only server-issued UUIDs are accepted
+    if not is_valid_session_id(session_id):
+        raise HTTPException(status_code=400, detail="Invalid session_id")
+
+
+def _session_header(session_id: str) -> dict | None:
+    """The session's record, from memory after the first read; TinyDB re-reads its whole file on every get."""
+    header = _session_headers.get(session_id)
+    if header is None:
+        header = chats_table.get(Chat.session_id == session_id)
+        if header is not None:
+            _session_headers.put(session_id, dict(header))
+    return header
+
+
+def _session_messages(session_doc: dict, last: int | None = None) -> list[dict]:
+    """A session's messages from its log, or from the record itself for sessions saved before the log."""
+    if "messages" in session_doc:
+        return session_doc["messages"][-last:] if last else session_doc["messages"]
+    return read_messages(session_doc["session_id"], last=last)
+
+
+def _save_turn(session_id: str, file_id: str, chat_history: list[dict], question: str, answer: str) -> None:
+    """Append the turn to the session's log; the session record is only written when it is created."""
+    turn = [
+        {"role": "user", "content": question},
+        {"role": "assistant", "content": answer},
+    ]
+
+    existing = _session_header(session_id)
+    if not existing:
+        now = datetime.now(timezone.utc).isoformat()
+        title = question[:60] + ("..." if len(question) > 60 else "")
+        header = {
+            "session_id": session_id,
+            "file_id": file_id,
+            "title": title,
+            "created_at": now,
+            "updated_at": now,
+        }
+        chats_table.insert(header)
+        _session_headers.put(session_id, header)
+        # History sent by the client for a session the server doesn't know yet
+        turn = chat_history + turn
+    elif "messages" in existing:
+        # Move an older session's messages into its log, once
+        turn = existing["messages"] + turn
+        chats_table.update(delete("messages"), Chat.session_id == session_id)
+        _session_headers.put(session_id, {k: v for k, v in existing.items() if k != "messages"})
+    append_messages(session_id, turn)
+
+
+async def chat_with_document(
+    file_id: str, question: str, chat_history: list[dict], session_id: str | None = None, language: str | None = None
+) -> ChatResponse:
+    # Retrieval, tools and the session write are blocking; they run in worker threads
+    session_id, chat_history, messages, context_chunks = await asyncio.to_thread(
+        _prepare_chat, file_id, question, chat_history, session_id, language
+    )
+
+    response = await llm_gateway.acomplete(
+        caller="chat",
         model=settings.CHAT_MODEL,
         messages=messages,
         tools=TOOLS,
@@ -166,41 +301,25 @@ def chat_with_document(
     tool_calls = response_message.tool_calls
 
     if tool_calls:
-        messages.append({
-            "role": response_message.role,
-            "content": response_message.content,
-            "tool_calls": [
-                {
-                    "id": t.id,
-                    "type": t.type,
-                    "function": {
-                        "name": t.function.name,
-                        "arguments": t.function.arguments,
-                    }
-                } for t in tool_calls
-            ]
-        })
-        for tool_call in tool_calls:
-            function_name = tool_call.function.name
-            function_args = json.loads(tool_call.function.arguments)
-            
-            if function_name == "generate_forecast":
-                tool_result = generate_forecast(
-                    file_id=file_id,
-                    date_column=function_args.get("date_column", "Date"),
-                    price_column=function_args.get("price_column", "Price"),
-                    months=function_args.get("months", 3)
-                )
-                
-                messages.append({
-                    "tool_call_id": tool_call.id,
-                    "role": "tool",
-                    "name": function_name,
-                    "content": json.dumps(tool_result),
-                })
+        calls = [
+            {
+                "id": t.id,
+                "type": t.type,
+                "function": {
+                    "name": t.function.name,
+                    "arguments": t.function.arguments,
+                }
+            } for t in tool_calls
+        ]
+        messages.append(_tool_call_message(response_message.content, calls))
+        for tool_call in calls:
+            tool_message = await asyncio.to_thread(_run_tool, file_id, tool_call)
+            if tool_message:
+                messages.append(tool_message)
         
         # Second call to LLM with tool results
-        second_response = client.chat.completions.create(
+        second_response = await llm_gateway.acomplete(
+            caller="chat",
             model=settings.CHAT_MODEL,
             messages=messages,
         )
@@ -208,59 +327,133 @@ def chat_with_document(
     else:
         answer = response_message.content
 
-    now = datetime.now(timezone.utc).isoformat()
-    new_messages = chat_history + [
-        {"role": "user", "content": question},
-        {"role": "assistant", "content": answer},
-    ]
-
-    existing = chats_table.get(Chat.session_id == session_id)
-    if existing:
-        chats_table.update({"messages": new_messages, "updated_at": now}, Chat.session_id == session_id)
-    else:
-        title = question[:60] + ("..." if len(question) > 60 else "")
-        chats_table.insert({
-            "session_id": session_id,
-            "file_id": file_id,
-            "title": title,
-            "messages": new_messages,
-            "created_at": now,
-            "updated_at": now,
-        })
+    await asyncio.to_thread(_save_turn, session_id, file_id, chat_history, question, answer)
 
     return ChatResponse(
         answer=answer,
-        sources=[chunk[:200] + "..." for chunk in context_chunks],
+        sources=_sources(context_chunks),
         session_id=session_id,
     )
 
-def get_chat_sessions(file_id: str) -> list[ChatSession]:
-    docs = chats_table.search(Chat.file_id == file_id)
-    sessions = []
-    for d in sorted(docs, key=lambda x: x.get("updated_at", ""), reverse=True):
-        sessions.append(ChatSession(
-            session_id=d["session_id"],
-            file_id=d["file_id"],
-            title=d["title"],
-            messages=d["messages"],
-            created_at=d["created_at"],
-            updated_at=d["updated_at"],
-        ))
-    return sessions
-
-def get_chat_session(session_id: str) -> ChatSession | None:
-    d = chats_table.get(Chat.session_id == session_id)
-    if not d:
-        return None
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _stream_completion(messages: list[dict], tools: list[dict] | None = None):
+    """Yield ("token", text) as content arrives, then ("tool_calls", calls) once complete."""
+    # Same settings as chat_with_document: the tool-choosing call runs at low temperature
+    kwargs = {"tools": tools, "tool_choice": "auto", "temperature": 0.2} if tools else {}
+    stream = llm_gateway.stream(caller="chat.stream", model=settings.CHAT_MODEL, messages=messages, **kwargs)
+    calls: dict[int, dict] = {}
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            yield "token", delta.content
+        # Tool calls arrive as fragments keyed by index: id and name first, then pieces of the arguments
+        for part in delta.tool_calls or []:
+            call = calls.setdefault(
+                part.index, {"id": "", "type": "function", "function": {"name": "", "arguments": ""}}
+            )
+            if part.id:
+                call["id"] = part.id
+            if part.function and part.function.name:
+                call["function"]["name"] += part.function.name
+            if part.function and part.function.arguments:
+                call["function"]["arguments"] += part.function.arguments
+    if calls:
+        yield "tool_calls", [calls[i] for i in sorted(calls)]
+
+
+def stream_chat(
+    file_id: str, question: str, chat_history: list[dict], session_id: str | None = None, language: str | None = None
+):
+    """Server-sent events for one chat turn.
+
+    Events: "sources" (session id and retrieved chunks, before any model call),
+    "token" (answer text as it streams), "tool" (tool call started / running /
+    completed), "done" (full answer, saved to the session) and "error".
+    """
+    try:
+        session_id, chat_history, messages, context_chunks = _prepare_chat(
+            file_id, question, chat_history, session_id, language
+        )
+    except Exception as e:
+        logger.exception(f"Chat stream setup failed for {file_id}")
+        yield _sse("error", {"detail": str(e)})
+        return
+    yield _sse("sources", {"session_id": session_id, "sources": _sources(context_chunks)})
+
+    answer = ""
+    try:
+        tool_calls = []
+        for kind, payload in _stream_completion(messages, tools=TOOLS):
+            if kind == "token":
+                answer += payload
+                yield _sse("token", {"content": payload})
+            else:
+                tool_calls = payload
+
+        if tool_calls:
+            messages.append(_tool_call_message(answer or None, tool_calls))
+            for tool_call in tool_calls:
+                name = tool_call["function"]["name"]
+                yield _sse("tool", {"name": name, "status": "started", "arguments": tool_call["function"]["arguments"]})
+                future = _tool_pool.submit(_run_tool, file_id, tool_call)
+                started = time.monotonic()
+                # Heartbeats keep the client informed (and the connection alive) while the model fits
+                while True:
+                    try:
+                        tool_message = future.result(timeout=TOOL_PROGRESS_SECONDS)
+                        break
+                    except FuturesTimeout:
+                        elapsed = round(time.monotonic() - started, 1)
+                        yield _sse("tool", {"name": name, "status": "running", "elapsed": elapsed})
+                failed = tool_message is not None and "error" in json.loads(tool_message["content"])
+                yield _sse("tool", {"name": name, "status": "failed" if failed else "completed"})
+                if tool_message:
+                    messages.append(tool_message)
+
+            for _, token in _stream_completion(messages):
+                answer += token
+                yield _sse("token", {"content": token})
+    except Exception as e:
+        logger.exception(f"Chat stream failed for {file_id}")
+        yield _sse("error", {"detail": str(e)})
+        return
+
+    _save_turn(session_id, file_id, chat_history, question, answer)
+    yield _sse("done", {"session_id": session_id, "answer": answer})
+
+
+def _to_session(d: dict, last: int | None = None) -> ChatSession:
     return ChatSession(
         session_id=d["session_id"],
         file_id=d["file_id"],
         title=d["title"],
-        messages=d["messages"],
+        messages=_session_messages(d, last=last),
         created_at=d["created_at"],
-        updated_at=d["updated_at"],
+        updated_at=log_updated_at(d["session_id"]) or d["updated_at"],
     )
 
+
+def get_chat_sessions(file_id: str) -> list[ChatSession]:
+    # The list only needs headers; a session's messages are fetched when it is opened
+    sessions = [_to_session(d, last=0) for d in chats_table.search(Chat.file_id == file_id)]
+    return sorted(sessions, key=lambda s: s.updated_at, reverse=True)
+
+def get_chat_session(session_id: str, last: int | None = None) -> ChatSession | None:
+    _check_session_id(session_id)
+    d = _session_header(session_id)
+    if not d:
+        return None
+    return _to_session(d, last=last)
+
 def delete_chat_session(session_id: str) -> bool:
+    _check_session_id(session_id)
     removed = chats_table.remove(Chat.session_id == session_id)
+    _session_headers.drop(lambda key: key == session_id)
+    delete_log(session_id)
     return len(removed) > 0
@@ -0,0 +1,113 @@
+"""Append-only message log per chat session.
+
+TinyDB rewrites its whole data.json on every update, so storing a session's
+messages there made each chat turn cost as much as all stored data. The
+session header (file, title, created_at) stays in TinyDB and is written
+once. Messages go to two files under CHAT_LOG_DIR:
+
+    {session_id}.jsonl  one JSON message per line, only ever appended
+    {session_id}.idx    one little-endian uint64 per message: the byte offset
+                        of its line, written after the line
+
+A turn appends two lines and two offsets. Reading the last N messages reads
+N offsets from the end of the index and the bytes after the first of them.
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+OFFSET = np.dtype("<u8")
+
+# A fixed set of locks striped by session id, so there is no per-session entry to clean up
+_session_locks = [threading.Lock() for _ in range(64)]
+
+
+def _session_lock(session_id: str) -> threading.Lock:
+    return _session_locks[hash(session_id) % len(_session_locks)]
+
+
+def is_valid_session_id(session_id: str) -> bool:
+    """Session ids are canonical UUIDs; anything else (e.g. '../x') must never reach a path."""
+    try:
+        return str(uuid.UUID(session_id)) == session_id
+    except (ValueError, TypeError, AttributeError):
+        return False
+
+
+def _paths(session_id: str) -> tuple[str, str]:
+    if not is_valid_session_id(session_id):
+        raise ValueError(f"Invalid chat session id: {session_id!r}")
+    base = os.path.join(settings.CHAT_LOG_DIR, session_id)
+    return f"{base}.jsonl", f"{base}.idx"
+
+
+def message_count(session_id: str) -> int:
+    _, idx_path = _paths(session_id)
+    return os.path.getsize(idx_path) // OFFSET.itemsize if os.path.exists(idx_path) else 0
+
+
+def append_messages(session_id: str, messages: list[dict]) -> None:
+    if not messages:
+        return
+    log_path, idx_path = _paths(session_id)
+    lines = [(json.dumps(m) + "\n").encode("utf-8") for m in messages]
+    with _session_lock(session_id):
+        os.makedirs(settings.CHAT_LOG_DIR, exist_ok=True)
+        # A crash between the two writes leaves an unindexed tail on the log (never read,
+        # because messages are sliced by offset) or a partial offset (truncated here)
+        count = message_count(session_id)
+        if os.path.exists(idx_path) and os.path.getsize(idx_path) != count * OFFSET.itemsize:
+            os.truncate(idx_path, count * OFFSET.itemsize)
+        start = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+        offsets = start + np.concatenate(([0], np.cumsum([len(line) for line in lines[:-1]], dtype=np.int64)))
+        with open(log_path, "ab") as f:
+            f.write(b"".join(lines))
+        with open(idx_path, "ab") as f:
+            f.write(offsets.astype(OFFSET).tobytes())
+
+
+def read_messages(session_id: str, last: int | None = None) -> list[dict]:
+    """The session's messages in order; only the last `last` of them if given."""
+    log_path, idx_path = _paths(session_id)
+    count = message_count(session_id)
+    if count == 0 or last == 0:
+        return []
+    n = count if last is None else min(last, count)
+    with open(idx_path, "rb") as f:
+        f.seek((count - n) * OFFSET.itemsize)
+        offsets = np.frombuffer(f.read(n * OFFSET.itemsize), dtype=OFFSET).astype(np.int64)
+    with open(log_path, "rb") as f:
+        f.seek(int(offsets[0]))
+        data = f.read()
+    starts = offsets - offsets[0]
+    messages = []
+    for i, begin in enumerate(starts):
+        end = starts[i + 1] if i + 1 < n else len(data)
+        line = data[begin:end]
+        messages.append(json.loads(line[:line.find(b"\n")]))
+    return messages
+
+
+def log_updated_at(session_id: str) -> str | None:
+    """When the last message was appended (the log's mtime), as an ISO timestamp."""
+    log_path, _ = _paths(session_id)
+    if not os.path.exists(log_path):
+        return None
+    return datetime.fromtimestamp(os.path.getmtime(log_path), timezone.utc).isoformat()
+
+
+def delete_log(session_id: str) -> None:
+    with _session_lock(session_id):
+        for path in _paths(session_id):
+            if os.path.exists(path):
+                os.remove(path)
@@ -1,8 +1,31 @@
+import logging
+import os
+import shutil
+import threading
+
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
 
 from app.core.config import settings
+from app.services.blobs import resolve_vector_id
+from app.services.embedding_cache import CachedEmbeddings
+from app.services.embedder import EmbeddingExecutor
+from app.services.lexical import LexicalIndex, save_lexical_index, load_lexical_index, delete_lexical_index
+from app.services.numpy_store import NumpyVectorStore
+from app.services.retrieval_cache import retrieval_cache, vector_version, invalidate_vectors, normalize_question
+from app.services.vector_pool import vectorstore_pool
+from app.utils.hashing import text_sha256
+
+logger = logging.getLogger(__name__)
+
+# VECTORSTORE_MODE=shared keeps every file in this one collection
+SHARED_DIR = "_shared"
+SHARED_COLLECTION = "documents"
+
+RRF_K = 60  # reciprocal rank fusion damping constant
 
 
 def chunk_text(text: str) -> list[str]:
@@ -14,27 +37,177 @@ def chunk_text(text: str) -> list[str]:
     return splitter.split_text(text)
 
 
-def create_vectorstore(file_id: str, chunks: list[str]) -> Chroma:
-    embeddings = OpenAIEmbeddings(
-        model=settings.EMBEDDING_MODEL,
-        openai_api_key=settings.OPENAI_API_KEY,
-    )
-    vectorstore = Chroma.from_texts(
-        texts=chunks,
-        embedding=embeddings,
-        persist_directory=f"{settings.VECTORSTORE_DIR}/{file_id}",
-        collection_name=file_id,
-    )
+_client: OpenAIEmbeddings | None = None
+_client_lock = threading.Lock()
+
+
+def _embeddings() -> CachedEmbeddings:
+    """The shared OpenAI embeddings client behind the persistent per-model embedding cache.
+
+    The wrapper is per call so each ingestion reports its own cache hit rate.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OpenAIEmbeddings(
+                model=settings.EMBEDDING_MODEL,
+                openai_api_key=settings.OPENAI_API_KEY,
+            )
+    return CachedEmbeddings(_client, settings.EMBEDDING_MODEL)
+
+
+def create_vectorstore(file_id: str, chunks: list[str]) -> VectorStore:
+    vectorstore = open_vectorstore(file_id)
+    # Token-bounded batches, embedded concurrently and written as each completes
+    executor = EmbeddingExecutor(vectorstore, metadata={"file_id": file_id}, vector_id=file_id)
+    executor.submit(chunks)
+    executor.close()
+    save_lexical_index(file_id, chunks)
+    invalidate_vectors(file_id)
+    logger.info(f"Embedded {len(chunks)} chunks for {file_id}, cache hit rate {vectorstore.embeddings.hit_rate:.0%}")
     return vectorstore
 
 
-def load_vectorstore(file_id: str) -> Chroma:
-    embeddings = OpenAIEmbeddings(
-        model=settings.EMBEDDING_MODEL,
-        openai_api_key=settings.OPENAI_API_KEY,
-    )
+def _is_shared() -> bool:
+    return settings.VECTORSTORE_MODE == "shared"
+
+
+def _store(vector_id: str, embeddings: CachedEmbeddings) -> VectorStore:
+    if settings.VECTORSTORE_BACKEND == "numpy":
+        directory = SHARED_DIR if _is_shared() else vector_id
+        return NumpyVectorStore(os.path.join(settings.VECTORSTORE_DIR, directory), embeddings)
+    if _is_shared():
+        # One collection for every file; chunks carry their file_id as metadata
+        return Chroma(
+            persist_directory=f"{settings.VECTORSTORE_DIR}/{SHARED_DIR}",
+            embedding_function=embeddings,
+            collection_name=SHARED_COLLECTION,
+        )
     return Chroma(
-        persist_directory=f"{settings.VECTORSTORE_DIR}/{file_id}",
+        persist_directory=f"{settings.VECTORSTORE_DIR}/{vector_id}",
         embedding_function=embeddings,
-        collection_name=file_id,
+        collection_name=vector_id,
     )
+
+
+def open_vectorstore(file_id: str) -> VectorStore:
+    """The store file_id's chunks are written to, for adding chunks batch by batch."""
+    return _store(file_id, _embeddings())
+
+
+def _pooled_store(vector_id: str) -> VectorStore:
+    key = SHARED_COLLECTION if _is_shared() else vector_id
+    return vectorstore_pool.get(key, lambda: _store(vector_id, _embeddings()))
+
+
+def load_vectorstore(file_id: str) -> VectorStore:
+    # Deduplicated uploads read the vectors of the file they alias
+    return _pooled_store(resolve_vector_id(file_id))
+
+
+def _lexical_index(vector_id: str) -> LexicalIndex:
+    """The BM25 index for vector_id, built from the stored chunks for files ingested before it existed."""
+    index = load_lexical_index(vector_id)
+    if index is None:
+        vectorstore = _pooled_store(vector_id)
+        where = {"file_id": vector_id} if _is_shared() else None
+        index = save_lexical_index(vector_id, vectorstore.get(where=where, include=["documents"])["documents"])
+    return index
+
+
+def _fuse(rankings: list[list[str]], k: int) -> list[str]:
+    """Reciprocal rank fusion of several ranked chunk lists."""
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking):
+            scores[chunk] = scores.get(chunk, 0.0) + 1.0 / (RRF_K + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)[:k]
+
+
+def retrieve(file_id: str, question: str, k: int = 4) -> list[Document]:
+    """The k chunks of file_id most relevant to question, cached until its vectors change."""
+    vector_id = resolve_vector_id(file_id)
+    key = (vector_id, vector_version(vector_id), settings.RETRIEVAL_MODE, k, normalize_question(question))
+    docs = retrieval_cache.get(key)
+    if docs is None:
+        docs = _retrieve(vector_id, question, k)
+        retrieval_cache.put(key, docs)
+    return list(docs)
+
+
+def _retrieve(vector_id: str, question: str, k: int) -> list[Document]:
+    """The k chunks of vector_id most relevant to question.
+
+    RETRIEVAL_MODE=hybrid fuses BM25 and vector rankings, and answers from BM25
+    alone when its best hit is decisive, saving the query embedding.
+    RETRIEVAL_MODE=lexical never calls the embeddings API.
+    """
+    mode = settings.RETRIEVAL_MODE
+    lexical = []
+    if mode != "vector":
+        index = _lexical_index(vector_id)
+        hits, all_terms = index.search(question, k * 4)
+        lexical = [index.chunks[i] for i, _ in hits]
+        decisive = all_terms and (
+            len(hits) == 1 or hits[0][1] >= settings.HYBRID_DECISIVE_MARGIN * hits[1][1]
+        )
+        if mode == "lexical" or decisive:
+            return [Document(page_content=c, metadata={"file_id": vector_id}) for c in lexical[:k]]
+
+    vectorstore = _pooled_store(vector_id)
+    if _is_shared():
+        docs = vectorstore.similarity_search(question, k=k * 2, filter={"file_id": vector_id})
+    else:
+        docs = vectorstore.similarity_search(question, k=k * 2)
+    if not lexical:
+        return docs[:k]
+    by_content = {doc.page_content: doc for doc in docs}
+    fused = _fuse([lexical, [doc.page_content for doc in docs]], k)
+    return [by_content.get(c) or Document(page_content=c, metadata={"file_id": vector_id}) for c in fused]
+
+
+def sync_vectorstore(vector_id: str, chunks: list[str], on_batch=None) -> tuple[int, int]:
+    """Make vector_id's store hold exactly chunks, embedding only chunks it lacks.
+
+    Stored chunks are matched by content hash, so unchanged chunks keep their
+    vectors and chunks that no longer exist are deleted. Returns (added, deleted).
+    """
+    vectorstore = open_vectorstore(vector_id)
+    where = {"file_id": vector_id} if _is_shared() else None
+    existing = vectorstore.get(where=where, include=["documents"])
+    wanted = {text_sha256(chunk): chunk for chunk in chunks}
+    kept: set[str] = set()
+    stale = []
+    for id_, document in zip(existing["ids"], existing["documents"]):
+        digest = text_sha256(document or "")
+        # Repeats of a kept chunk are stale too, e.g. duplicates in stores from before content ids
+        if digest in wanted and digest not in kept:
+            kept.add(digest)
+        else:
+            stale.append(id_)
+    new = [chunk for digest, chunk in wanted.items() if digest not in kept]
+
+    if stale:
+        vectorstore.delete(ids=stale)
+    executor = EmbeddingExecutor(vectorstore, on_batch=on_batch, metadata={"file_id": vector_id}, vector_id=vector_id)
+    executor.submit(new)
+    executor.close()
+    save_lexical_index(vector_id, chunks)
+    # Pooled handles may have cached the old rows
+    vectorstore_pool.invalidate(SHARED_COLLECTION if _is_shared() else vector_id)
+    invalidate_vectors(vector_id)
+    logger.info(f"Re-indexed {vector_id}: {len(new)} chunks added, {len(stale)} deleted, {len(kept)} unchanged")
+    return len(new), len(stale)
+
+
+def delete_vectors(vector_id: str) -> None:
+    delete_lexical_index(vector_id)
+    invalidate_vectors(vector_id)
+    if _is_shared():
+        vectorstore = load_vectorstore(vector_id)
+        ids = vectorstore.get(where={"file_id": vector_id}, include=[])["ids"]
+        if ids:
+            vectorstore.delete(ids=ids)
+        return
+    vectorstore_pool.invalidate(vector_id)
+    shutil.rmtree(os.path.join(settings.VECTORSTORE_DIR, vector_id), ignore_errors=True)
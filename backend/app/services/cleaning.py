@@ -3,14 +3,12 @@
 import json
 import numpy as np
 import pandas as pd
-from openai import OpenAI
 
 from app.core.config import settings
+from app.services import llm_gateway
 from app.models.schemas import CleaningIssue, DataCleaningResponse
 from app.utils.serialization import cleanup_serializable
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
 
 def assess_data_quality(file_id: str, df: pd.DataFrame) -> DataCleaningResponse:
     issues: list[CleaningIssue] = []
@@ -128,7 +126,8 @@ Issues found:
 
 Provide 3-5 specific, actionable data cleaning recommendations. Focus on practical steps."""
 
-    response = client.chat.completions.create(
+    response = llm_gateway.complete(
+        caller="cleaning",
         model=settings.ANALYSIS_MODEL,
         messages=[
             {"role": "system", "content": "You are a data quality expert. Give concise, practical cleaning advice. Return JSON with key 'recommendations' as a list of strings."},
@@ -0,0 +1,139 @@
+"""Typed columnar (Parquet) sidecars for tabular uploads.
+
+The original CSV/Excel file stays the source of truth. A Parquet copy is
+written next to it once, and later reads memory-map that copy instead of
+re-parsing text and re-inferring dtypes on every request.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def sidecar_path(file_path: str, sheet_index: int = 0) -> str:
+    """Sheet 0 (or the only table) lives in {file_id}.parquet, further Excel sheets in {file_id}.sheet{n}.parquet."""
+    suffix = f".sheet{sheet_index}" if sheet_index else ""
+    return os.path.join(settings.COLUMNAR_DIR, f"{Path(file_path).stem}{suffix}.parquet")
+
+
+def _manifest_path(file_path: str) -> str:
+    return os.path.join(settings.COLUMNAR_DIR, f"{Path(file_path).stem}.sheets.json")
+
+
+def _digest_path(file_path: str) -> str:
+    return os.path.join(settings.COLUMNAR_DIR, f"{Path(file_path).stem}.digest.txt")
+
+
+def _is_fresh(artifact_path: str, file_path: str) -> bool:
+    try:
+        return os.path.getmtime(artifact_path) >= os.path.getmtime(file_path)
+    except OSError:
+        return False
+
+
+def is_sidecar_fresh(file_path: str, sheet_index: int = 0) -> bool:
+    """A sidecar is only valid if it was written after the source file."""
+    return _is_fresh(sidecar_path(file_path, sheet_index), file_path)
+
+
+def write_sidecar(file_path: str, df: pd.DataFrame, sheet_index: int = 0) -> str | None:
+    """Persist a typed copy of df for file_path. Returns the sidecar path or None."""
+    if not PYARROW_AVAILABLE:
+        return None
+
+    path = sidecar_path(file_path, sheet_index)
+    tmp_path = f"{path}.tmp"
+    os.makedirs(settings.COLUMNAR_DIR, exist_ok=True)
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_table(table, tmp_path)
+        # Atomic swap so concurrent readers never see a half-written file
+        os.replace(tmp_path, path)
+        return path
+    except Exception as e:
+        # Mixed-type object columns cannot be represented in Arrow; keep using the source file
+        logger.warning(f"Could not write columnar sidecar for {file_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+
+def read_sidecar(file_path: str, columns: list[str] | None = None, sheet_index: int = 0) -> pd.DataFrame | None:
+    """Memory-map the sidecar for file_path, loading only the requested columns."""
+    if not PYARROW_AVAILABLE or not is_sidecar_fresh(file_path, sheet_index):
+        return None
+    path = sidecar_path(file_path, sheet_index)
+    try:
+        if columns is not None:
+            available = set(pq.read_schema(path).names)
+            columns = [c for c in columns if c in available]
+        table = pq.read_table(path, columns=columns, memory_map=True)
+        return table.to_pandas()
+    except Exception as e:
+        logger.warning(f"Could not read columnar sidecar for {file_path}: {e}")
+        return None
+
+
+def write_sheet_sidecars(file_path: str, sheets: dict[str, pd.DataFrame]) -> None:
+    """Persist every sheet of a workbook plus a manifest of sheet names."""
+    if not PYARROW_AVAILABLE:
+        return
+    for i, df in enumerate(sheets.values()):
+        write_sidecar(file_path, df, sheet_index=i)
+    with open(_manifest_path(file_path), "w", encoding="utf-8") as f:
+        json.dump(list(sheets.keys()), f)
+
+
+def read_sheet_manifest(file_path: str) -> list[str] | None:
+    path = _manifest_path(file_path)
+    if not _is_fresh(path, file_path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_digest(file_path: str, digest: str) -> None:
+    """Store the text digest (schema, summary stats, sample) used for chunking and prompts."""
+    path = _digest_path(file_path)
+    tmp_path = f"{path}.tmp"
+    os.makedirs(settings.COLUMNAR_DIR, exist_ok=True)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(digest)
+    os.replace(tmp_path, path)
+
+
+def read_digest(file_path: str) -> str | None:
+    path = _digest_path(file_path)
+    if not _is_fresh(path, file_path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def remove_sidecar(file_path: str) -> None:
+    if os.path.exists(_digest_path(file_path)):
+        os.remove(_digest_path(file_path))
+    manifest = _manifest_path(file_path)
+    sheet_count = 1
+    if os.path.exists(manifest):
+        with open(manifest, "r", encoding="utf-8") as f:
+            sheet_count = max(1, len(json.load(f)))
+        os.remove(manifest)
+    for i in range(sheet_count):
+        path = sidecar_path(file_path, i)
+        if os.path.exists(path):
+            os.remove(path)
@@ -1,23 +1,20 @@
 """Multi-file comparison analysis using AI."""
 
 import json
-import os
-from openai import OpenAI
 
 from app.core.config import settings
-from app.services.file_parser import extract_text, extract_dataframe, SUPPORTED_EXTENSIONS
+from app.services import llm_gateway
+from app.services.file_parser import extract_text, extract_dataframe
+from app.services.file_index import resolve_file_path
 from app.models.schemas import CompareResponse
 from app.utils.serialization import cleanup_serializable
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
 
 def find_file_path(file_id: str) -> str:
-    for ext in SUPPORTED_EXTENSIONS:
-        path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{ext}")
-        if os.path.exists(path):
-            return path
-    raise FileNotFoundError(f"File not found: {file_id}")
+    path = resolve_file_path(file_id)
+    if not path:
+        raise FileNotFoundError(f"File not found: {file_id}")
+    return path
 
 
 def compare_files(file_ids: list[str], custom_prompt: str | None = None) -> CompareResponse:
@@ -72,7 +69,8 @@ Return JSON:
     "file_summaries": {{"file_id_short": "summary"}}
 }}"""
 
-    response = client.chat.completions.create(
+    response = llm_gateway.complete(
+        caller="compare",
         model=settings.ANALYSIS_MODEL,
         messages=[
             {"role": "system", "content": "You are a senior data analyst. Provide comparative intelligence comparing shifts in metrics and business strategies. Return valid JSON only."},
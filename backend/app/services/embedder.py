@@ -0,0 +1,181 @@
+"""Batched, bounded-concurrency embedding with retries.
+
+Chunks are packed into batches bounded by an estimated token budget (and a
+chunk count), each batch is embedded on a shared pool with exponential
+backoff on transient API errors, and written to the vector store as soon as
+it completes. The number of batches in flight is capped per executor so a
+fast parser cannot queue an entire document in memory.
+"""
+
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable
+
+import openai
+
+from app.core.config import settings
+from app.utils.hashing import text_sha256
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+_pool = ThreadPoolExecutor(max_workers=settings.EMBED_WORKERS, thread_name_prefix="embed")
+
+
+def count_tokens(text: str) -> int:
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1  # ~4 characters per token for English text
+
+
+class BatchPacker:
+    """Accumulate chunks and emit batches within the token and size limits."""
+
+    def __init__(self, max_tokens: int | None = None, max_chunks: int | None = None):
+        self.max_tokens = max_tokens or settings.EMBED_BATCH_TOKENS
+        self.max_chunks = max_chunks or settings.EMBED_BATCH_MAX_CHUNKS
+        self._batch: list[str] = []
+        self._tokens = 0
+
+    def add(self, chunk: str) -> list[str] | None:
+        """Add a chunk; returns the batch it closed, if any."""
+        tokens = count_tokens(chunk)
+        ready = None
+        if self._batch and (self._tokens + tokens > self.max_tokens or len(self._batch) >= self.max_chunks):
+            ready = self.flush()
+        self._batch.append(chunk)
+        self._tokens += tokens
+        return ready
+
+    def flush(self) -> list[str] | None:
+        batch, self._batch, self._tokens = self._batch, [], 0
+        return batch or None
+
+
+def chunk_id(vector_id: str, chunk: str) -> str:
+    """Deterministic id of a chunk in vector_id's store, so re-indexing can diff by content."""
+    return f"{vector_id}:{text_sha256(chunk)}"
+
+
+def embed_with_retry(embeddings, texts: list[str]) -> list[list[float]]:
+    attempt = 0
+    while True:
+        try:
+            return embeddings.embed_documents(texts)
+        except RETRYABLE_ERRORS as e:
+            attempt += 1
+            if attempt > settings.EMBED_MAX_RETRIES:
+                raise
+            # Full jitter keeps concurrent batches from retrying in lockstep
+            delay = random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+            logger.warning(f"Embedding batch of {len(texts)} failed ({e}); retry {attempt} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def add_embedded(
+    store, texts: list[str], vectors: list[list[float]], metadatas: list[dict] | None = None,
+    ids: list[str] | None = None,
+) -> None:
+    """Write chunks with their vectors, without the store embedding them again.
+
+    add_texts() would look every chunk up in the embedding cache a second time,
+    reading back what was just written and counting each chunk as a miss and a hit.
+    """
+    if hasattr(store, "add_embeddings"):
+        store.add_embeddings(texts, vectors, metadatas=metadatas, ids=ids)
+        return
+    # Chroma has no public way to add precomputed vectors; its add_texts() embeds, then
+    # upserts into the chromadb collection it keeps as _collection. Use that collection
+    # while the wrapper still has it, and the public path (embedding again) if it changes.
+    collection = getattr(store, "_collection", None)
+    if collection is None or not hasattr(collection, "upsert"):
+        logger.warning(f"{type(store).__name__} has no chromadb collection to upsert into; storing through add_texts()")
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return
+    collection.upsert(
+        ids=ids or [uuid.uuid4().hex for _ in texts], embeddings=vectors, documents=texts, metadatas=metadatas
+    )
+
+
+class EmbeddingExecutor:
+    """Stream chunks into a vector store in token-bounded batches.
+
+    Usage: call submit() as chunks are produced, then close() to flush the last
+    batch and wait. on_batch(n) is called after each batch of n chunks is stored;
+    metadata is attached to every chunk. With vector_id set, chunks are stored
+    under chunk_id(vector_id, chunk) and repeats of a chunk are skipped.
+    """
+
+    def __init__(
+        self,
+        store,
+        on_batch: Callable[[int], None] | None = None,
+        metadata: dict | None = None,
+        vector_id: str | None = None,
+    ):
+        self.store = store
+        self.on_batch = on_batch
+        self.metadata = metadata
+        self.vector_id = vector_id
+        self._seen: set[str] = set()
+        self.packer = BatchPacker()
+        self.max_in_flight = settings.EMBED_WORKERS * 2
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def _run(self, batch: list[str]) -> None:
+        vectors = embed_with_retry(self.store.embeddings, batch)
+        metadatas = [dict(self.metadata) for _ in batch] if self.metadata else None
+        ids = [chunk_id(self.vector_id, chunk) for chunk in batch] if self.vector_id else None
+        add_embedded(self.store, batch, vectors, metadatas=metadatas, ids=ids)
+        if self.on_batch:
+            self.on_batch(len(batch))
+
+    def _dispatch(self, batch: list[str]) -> None:
+        with self._lock:
+            while len(self._in_flight) >= self.max_in_flight:
+                done, self._in_flight = wait(self._in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            self._in_flight.add(_pool.submit(self._run, batch))
+
+    def submit(self, chunks: list[str]) -> None:
+        for chunk in chunks:
+            if self.vector_id:
+                if chunk in self._seen:
+                    continue
+                self._seen.add(chunk)
+            batch = self.packer.add(chunk)
+            if batch:
+                self._dispatch(batch)
+
+    def close(self) -> None:
+        batch = self.packer.flush()
+        if batch:
+            self._dispatch(batch)
+        try:
+            for future in list(self._in_flight):
+                future.result()
+        finally:
+            self.cancel()
+
+    def cancel(self) -> None:
+        for future in self._in_flight:
+            future.cancel()
+        self._in_flight = set()
@@ -0,0 +1,151 @@
+"""Disk-backed embedding cache keyed by (sha256(chunk), embedding model).
+
+Each model gets a directory holding one append-only float32 matrix
+(vectors.f32, one row per cached chunk) and an append-only index
+(index.txt, one chunk hash per line; line n is row n). The index is loaded
+into memory once; rows are read back through a memory map.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+from app.services.retrieval_cache import query_embedding_cache, normalize_question
+from app.utils.hashing import text_sha256
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    def __init__(self, model: str, cache_dir: str | None = None):
+        self.model = model
+        safe_model = re.sub(r"[^A-Za-z0-9._-]", "_", model)
+        self.dir = os.path.join(cache_dir or settings.EMBEDDING_CACHE_DIR, safe_model)
+        self._vectors_path = os.path.join(self.dir, "vectors.f32")
+        self._index_path = os.path.join(self.dir, "index.txt")
+        self._meta_path = os.path.join(self.dir, "meta.json")
+        self._lock = threading.Lock()
+        self._rows: dict[str, int] | None = None
+        self._dim: int | None = None
+        self._mmap: np.ndarray | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> None:
+        if self._rows is not None:
+            return
+        self._rows = {}
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            self._dim = json.load(f)["dim"]
+        # A crash between the two appends leaves extra vectors or hashes; trust only complete rows
+        complete = os.path.getsize(self._vectors_path) // (self._dim * 4) if os.path.exists(self._vectors_path) else 0
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            for row, line in enumerate(f):
+                if row >= complete:
+                    break
+                self._rows[line.strip()] = row
+        logger.info(f"Loaded embedding cache for {self.model}: {len(self._rows)} vectors")
+
+    def _matrix(self) -> np.ndarray:
+        rows = len(self._rows)
+        if self._mmap is None or self._mmap.shape[0] < rows:
+            self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim))
+        return self._mmap
+
+    def get_many(self, keys: list[str]) -> list[list[float] | None]:
+        with self._lock:
+            self._load()
+            found = [self._rows.get(k) for k in keys]
+            hits = [row for row in found if row is not None]
+            matrix = self._matrix() if hits else None
+            result = [matrix[row].tolist() if row is not None else None for row in found]
+            self.hits += len(hits)
+            self.misses += len(keys) - len(hits)
+        return result
+
+    def put_many(self, keys: list[str], vectors: list[list[float]]) -> None:
+        if not keys:
+            return
+        array = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            self._load()
+            if self._dim is None:
+                os.makedirs(self.dir, exist_ok=True)
+                self._dim = array.shape[1]
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model, "dim": self._dim}, f)
+            fresh = [i for i, k in enumerate(keys) if k not in self._rows]
+            # Duplicate chunks within one batch are stored once
+            fresh = list({keys[i]: i for i in fresh}.values())
+            if not fresh:
+                return
+            with open(self._vectors_path, "ab") as f:
+                f.write(array[fresh].tobytes())
+            with open(self._index_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{keys[i]}\n" for i in fresh))
+            for i in fresh:
+                self._rows[keys[i]] = len(self._rows)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+_caches: dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model: str) -> EmbeddingCache:
+    with _caches_lock:
+        if model not in _caches:
+            _caches[model] = EmbeddingCache(model)
+        return _caches[model]
+
+
+class CachedEmbeddings(Embeddings):
+    """Wrap an Embeddings client so documents already embedded with this model are never re-sent."""
+
+    def __init__(self, inner: Embeddings, model: str):
+        self.inner = inner
+        self.model = model
+        self.cache = get_embedding_cache(model)
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [text_sha256(t) for t in texts]
+        vectors = self.cache.get_many(keys)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            # Repeated chunks (e.g. boilerplate headers) are sent once
+            unique = list({keys[i]: i for i in missing}.values())
+            embedded = self.inner.embed_documents([texts[i] for i in unique])
+            self.cache.put_many([keys[i] for i in unique], embedded)
+            by_key = {keys[i]: vector for i, vector in zip(unique, embedded)}
+            for i in missing:
+                vectors[i] = by_key[keys[i]]
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        key = (self.model, normalize_question(text))
+        vector = query_embedding_cache.get(key)
+        if vector is None:
+            vector = self.inner.embed_query(text)
+            query_embedding_cache.put(key, vector)
+        return vector
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,107 @@
+"""Excel workbook ingestion.
+
+The engine is chosen from the file signature instead of trying each engine in
+turn, .xlsx sheets are streamed with openpyxl's read-only mode, and multi-sheet
+workbooks are parsed one sheet per process so the workbook is read in one pass.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import pandas as pd
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+XLSX_SIGNATURE = b"PK\x03\x04"  # ZIP container (xlsx/xlsm)
+XLS_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"  # OLE2 compound document (xls)
+
+
+def detect_excel_engine(file_path: str) -> str:
+    with open(file_path, "rb") as f:
+        signature = f.read(8)
+    if signature.startswith(XLSX_SIGNATURE):
+        return "openpyxl"
+    if signature == XLS_SIGNATURE:
+        return "xlrd"
+    raise ValueError(f"{file_path} is not an Excel workbook (unrecognized file signature)")
+
+
+def _column_names(header: tuple) -> list[str]:
+    """Name columns the way pd.read_excel does: blanks become 'Unnamed: i', repeats get '.n'."""
+    names, seen = [], {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None or str(value).strip() == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _rows_to_frame(rows, nrows: int | None = None) -> pd.DataFrame:
+    header = None
+    data = []
+    for row in rows:
+        if all(v is None for v in row):
+            continue  # pandas skips blank lines, including above the header
+        if header is None:
+            header = row
+            continue
+        if nrows is not None and len(data) >= nrows:
+            break
+        data.append(row)
+    if header is None:
+        return pd.DataFrame()
+
+    width = max([len(header)] + [len(r) for r in data])
+    header = tuple(header) + (None,) * (width - len(header))
+    data = [tuple(r) + (None,) * (width - len(r)) for r in data]
+    return pd.DataFrame(data, columns=_column_names(header))
+
+
+def list_sheets(file_path: str) -> list[str]:
+    if detect_excel_engine(file_path) == "xlrd":
+        return pd.ExcelFile(file_path, engine="xlrd").sheet_names
+    from openpyxl import load_workbook
+    wb = load_workbook(file_path, read_only=True)
+    try:
+        return wb.sheetnames
+    finally:
+        wb.close()
+
+
+def read_sheet(file_path: str, sheet: str | int = 0, nrows: int | None = None) -> pd.DataFrame:
+    """Read a single sheet, streaming rows for .xlsx."""
+    engine = detect_excel_engine(file_path)
+    if engine == "xlrd":
+        return pd.read_excel(file_path, sheet_name=sheet, nrows=nrows, engine="xlrd")
+
+    from openpyxl import load_workbook
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[sheet] if isinstance(sheet, int) else wb[sheet]
+        return _rows_to_frame(ws.iter_rows(values_only=True), nrows=nrows)
+    finally:
+        wb.close()
+
+
+def read_workbook(file_path: str) -> dict[str, pd.DataFrame]:
+    """Read every sheet of a workbook, in sheet order."""
+    if detect_excel_engine(file_path) == "xlrd":
+        # xlrd loads the whole compound document anyway; one call returns every sheet
+        return pd.read_excel(file_path, sheet_name=None, engine="xlrd")
+
+    sheets = list_sheets(file_path)
+    if len(sheets) <= 1 or settings.EXCEL_SHEET_WORKERS <= 1:
+        return {name: read_sheet(file_path, name) for name in sheets}
+
+    # Each worker opens the archive read-only and inflates only its own sheet XML
+    workers = min(len(sheets), settings.EXCEL_SHEET_WORKERS)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        frames = list(pool.map(read_sheet, repeat(file_path), sheets))
+    return dict(zip(sheets, frames))
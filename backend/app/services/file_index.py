@@ -0,0 +1,74 @@
+"""In-memory file_id -> path index.
+
+Uploads record their on-disk path in files_table; the index is warmed from
+those records at startup so resolving a file is a dict lookup. Files uploaded
+before paths were recorded are located by probing extensions once and then
+remembered.
+"""
+
+import os
+import threading
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.database import files_table, File
+from app.services.file_parser import SUPPORTED_EXTENSIONS
+
+LEGACY_UPLOAD_DIR = "./uploads"
+
+_paths: dict[str, str] = {}
+_lock = threading.Lock()
+
+
+def warm_file_index() -> int:
+    """Load every stored file path into memory. Returns the number of entries."""
+    with _lock:
+        for doc in files_table.all():
+            if doc.get("file_path"):
+                _paths[doc["file_id"]] = doc["file_path"]
+        return len(_paths)
+
+
+def register_file_path(file_id: str, file_path: str) -> None:
+    with _lock:
+        _paths[file_id] = file_path
+
+
+def forget_file_path(file_id: str) -> None:
+    with _lock:
+        _paths.pop(file_id, None)
+
+
+def _scan_for_file(file_id: str) -> str | None:
+    for ext in SUPPORTED_EXTENSIONS:
+        path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{ext}")
+        if os.path.exists(path):
+            return path
+        # Fallback to legacy path
+        legacy_path = os.path.join(LEGACY_UPLOAD_DIR, f"{file_id}{ext}")
+        if os.path.exists(legacy_path):
+            return legacy_path
+    return None
+
+
+def resolve_file_path(file_id: str) -> str | None:
+    path = _paths.get(file_id)
+    if path:
+        return path
+
+    # Not warmed yet (e.g. inserted by another worker) or a legacy record without a stored path
+    doc = files_table.get(File.file_id == file_id)
+    path = doc.get("file_path") if doc else None
+    if not path or not os.path.exists(path):
+        path = _scan_for_file(file_id)
+    if path:
+        register_file_path(file_id, path)
+    return path
+
+
+def find_file_path(file_id: str) -> str:
+    path = resolve_file_path(file_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="File not found")
+    return path
@@ -1,7 +1,6 @@
 import os
 import uuid
 import pandas as pd
-from pypdf import PdfReader
 from docx import Document
 from pathlib import Path
 import logging
@@ -18,7 +17,14 @@ if not logger.handlers:
     logger.setLevel(logging.ERROR)
 
 from app.core.config import settings
-from app.services.ocr import ocr_pdf, ocr_image, needs_ocr, is_ocr_available
+from app.services.ocr import ocr_pdf_pages, ocr_image, page_needs_ocr, is_ocr_available
+from app.services.pdf_pages import extract_pdf_pages
+from app.services.columnar import read_sidecar, write_sidecar, write_sheet_sidecars, read_sheet_manifest, read_digest, write_digest
+from app.services.excel import read_workbook
+from app.services.frame_cache import frame_cache
+from app.services.sniffer import SNIFF_BYTES, sniff_reader_config, remember_reader_config, read_csv
+from app.services.streaming import is_out_of_core, profile_csv
+from app.utils.hashing import remember_file_sha256
 
 
 SUPPORTED_EXTENSIONS = {
@@ -26,6 +32,8 @@ SUPPORTED_EXTENSIONS = {
     ".png", ".jpg", ".jpeg", ".tiff", ".bmp",
 }
 
+TABULAR_EXTENSIONS = {".csv", ".xlsx", ".xls", ".json"}
+
 
 def get_file_extension(filename: str) -> str:
     return Path(filename).suffix.lower()
@@ -50,19 +58,35 @@ def save_uploaded_file(file_content: bytes, filename: str) -> tuple[str, str]:
     return file_id, save_path
 
 
-async def save_uploaded_file_stream(file, filename: str) -> tuple[str, str]:
-    """Save a FastAPI UploadFile stream to disk in chunks to save memory."""
+async def save_uploaded_file_stream(file, filename: str) -> tuple[str, str, str]:
+    """Save a FastAPI UploadFile stream to disk in chunks to save memory.
+
+    Returns (file_id, save_path, sha256). The content hash is computed on the way
+    through, and for CSVs the reader configuration is sniffed from the first few MB;
+    fetch it with get_reader_config(save_path).
+    """
     import aiofiles
+    import hashlib
     file_id = str(uuid.uuid4())
     ext = get_file_extension(filename)
     save_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}{ext}")
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-    
+
+    head = bytearray()
+    h = hashlib.sha256()
     async with aiofiles.open(save_path, "wb") as f:
         while chunk := await file.read(1024 * 1024): # 1MB chunks
             await f.write(chunk)
-            
-    return file_id, save_path
+            h.update(chunk)
+            if ext == ".csv" and len(head) < SNIFF_BYTES:
+                head += chunk[:SNIFF_BYTES - len(head)]
+
+    if ext == ".csv":
+        remember_reader_config(file_id, sniff_reader_config(bytes(head)))
+    sha256 = h.hexdigest()
+    remember_file_sha256(save_path, sha256)
+
+    return file_id, save_path, sha256
 
 
 def extract_text(file_path: str) -> str:
@@ -70,15 +94,7 @@ def extract_text(file_path: str) -> str:
 
     try:
         if ext == ".pdf":
-            text = _extract_pdf(file_path)
-            if needs_ocr(file_path, text) and is_ocr_available():
-                try:
-                    ocr_text = ocr_pdf(file_path)
-                    if len(ocr_text) > len(text):
-                        return ocr_text
-                except Exception:
-                    pass  # OCR failed, fall back to normal text
-            return text
+            return _extract_pdf(file_path)
         elif ext in (".xlsx", ".xls"):
             return _extract_excel(file_path)
         elif ext == ".csv":
@@ -97,69 +113,168 @@ def extract_text(file_path: str) -> str:
         return f"[Error extracting text from {ext} file: {str(e)}]"
 
 
-def extract_dataframe(file_path: str) -> pd.DataFrame | None:
+def extract_dataframe(file_path: str, columns: list[str] | None = None) -> pd.DataFrame | None:
+    """Load a tabular file as a DataFrame.
+
+    Frames are shared process-wide through frame_cache, which hands out its own
+    copy of the cached frame (a deep copy, or a shallow one when pandas Copy-on-Write
+    is in effect), so callers may modify the result freely.
+    """
     ext = get_file_extension(file_path)
+    if ext not in TABULAR_EXTENSIONS:
+        return None
+
+    df = frame_cache.get(file_path)
+    if df is not None:
+        return df[[c for c in columns if c in df.columns]] if columns else df
+
+    # Fast path: memory-mapped typed copy written at upload time
+    df = read_sidecar(file_path, columns=columns)
+    if df is not None:
+        if not columns:
+            frame_cache.put(file_path, df)
+        return df
+
     try:
         if ext == ".csv":
-            return pd.read_csv(file_path)
+            df = read_csv(file_path)
         elif ext in (".xlsx", ".xls"):
-            try:
-                # Try default auto-detect
-                return pd.read_excel(file_path)
-            except Exception:
-                try:
-                    # Try openpyxl
-                    return pd.read_excel(file_path, engine='openpyxl')
-                except Exception:
-                    # Try xlrd (older .xls)
-                    return pd.read_excel(file_path, engine='xlrd')
+            # One pass over the workbook; every sheet gets its own columnar artifact
+            sheets = read_workbook(file_path)
+            if not sheets:
+                return None
+            write_sheet_sidecars(file_path, sheets)
+            df = next(iter(sheets.values()))
         elif ext == ".json":
-            return pd.read_json(file_path)
+            df = pd.read_json(file_path)
     except Exception as e:
         logger.error(f"Failed to extract dataframe from {file_path}: {e}")
         return None
-    return None
+
+    # Files uploaded before sidecars existed get one on first read
+    write_sidecar(file_path, df)
+    frame_cache.put(file_path, df)
+    if columns:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
+
+def extract_sheets(file_path: str) -> dict[str, pd.DataFrame] | None:
+    """All sheets of a workbook keyed by name (a single entry for other tabular files)."""
+    if get_file_extension(file_path) not in (".xlsx", ".xls"):
+        df = extract_dataframe(file_path)
+        return {Path(file_path).stem: df} if df is not None else None
+
+    # Loading the first sheet also writes the per-sheet artifacts on a cold read
+    first = extract_dataframe(file_path)
+    if first is None:
+        return None
+    names = read_sheet_manifest(file_path)
+    if not names:
+        return read_workbook(file_path)
+    sheets = {names[0]: first}
+    for i, name in enumerate(names[1:], start=1):
+        df = read_sidecar(file_path, sheet_index=i)
+        if df is None:
+            return read_workbook(file_path)
+        sheets[name] = df
+    return sheets
+
+
+def _iter_pdf_pages(file_path: str):
+    """Yield (page, text) pairs: text-layer pages first, then the scanned pages once OCR'd."""
+    pages = extract_pdf_pages(file_path)
+    # Decide per page, so one scanned page in a text PDF still gets OCR'd
+    scanned = [i for i, text in enumerate(pages) if page_needs_ocr(text)]
+    if not is_ocr_available():
+        scanned = []
+    pending = set(scanned)
+    for i, text in enumerate(pages):
+        if i not in pending:
+            yield i, text
+    if not scanned:
+        return
+    try:
+        ocr_texts = ocr_pdf_pages(file_path, scanned)
+    except Exception:
+        ocr_texts = {}  # OCR failed, fall back to normal text
+    for i in scanned:
+        ocr_text = ocr_texts.get(i, "")
+        yield i, ocr_text if len(ocr_text) > len(pages[i].strip()) else pages[i]
 
 
 def _extract_pdf(file_path: str) -> str:
-    reader = PdfReader(file_path)
-    text_parts = []
-    for page in reader.pages:
-        text = page.extract_text()
-        if text:
-            text_parts.append(text)
-    return "\n\n".join(text_parts)
+    pages = dict(_iter_pdf_pages(file_path))
+    return "\n\n".join(pages[i] for i in sorted(pages) if pages[i])
 
 
-def _extract_excel(file_path: str) -> str:
+def iter_text_segments(file_path: str):
+    """Yield a document's text in pieces so chunking can start before extraction ends.
+
+    PDFs are yielded page by page; every other type is a single segment equal to extract_text().
+    """
+    if get_file_extension(file_path) != ".pdf":
+        yield extract_text(file_path)
+        return
     try:
-        try:
-            df = pd.read_excel(file_path)
-        except Exception:
-            try:
-                df = pd.read_excel(file_path, engine='openpyxl')
-            except Exception:
-                df = pd.read_excel(file_path, engine='xlrd')
-        
-        return f"Columns: {', '.join(df.columns.tolist())}\n\n{df.to_string(max_rows=200)}"
+        for _, text in _iter_pdf_pages(file_path):
+            if text:
+                yield text
     except Exception as e:
-        return f"[Excel Parsing Error: {str(e)}]"
+        yield f"[Error extracting text from .pdf file: {str(e)}]"
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """Compact text stand-in for a table: schema, summary statistics and an evenly spaced sample."""
+    lines = [f"Columns: {', '.join(map(str, df.columns))}", f"Rows: {len(df)}", "", "Schema:"]
+    nulls = df.isna().sum()
+    for col in df.columns:
+        lines.append(f"- {col} ({df[col].dtype}): {int(nulls[col])} nulls, {df[col].nunique()} unique")
+
+    numeric = df.select_dtypes(include="number")
+    if not numeric.empty:
+        lines += ["", "Summary statistics:", numeric.describe().T.to_string()]
+
+    top_values = []
+    for col in df.select_dtypes(exclude="number").columns:
+        counts = df[col].value_counts().head(5)
+        if not counts.empty:
+            top_values.append(f"- {col}: " + ", ".join(f"{value} ({n})" for value, n in counts.items()))
+    if top_values:
+        lines += ["", "Top values:", *top_values]
+
+    n = settings.DIGEST_SAMPLE_ROWS
+    sample = df.iloc[::max(1, len(df) // n)].head(n) if n > 0 else df.head(0)
+    lines += ["", f"Sample rows ({len(sample)} of {len(df)}):", sample.to_string()]
+    return "\n".join(lines)
+
+
+def _extract_tabular(file_path: str, error: str) -> str:
+    """Serve the stored digest; on a miss, parse once and store the sidecars and the digest."""
+    digest = read_digest(file_path)
+    if digest is not None:
+        return digest
+
+    if is_out_of_core(file_path):
+        digest = profile_csv(file_path).to_text()
+    else:
+        sheets = extract_sheets(file_path)
+        if not sheets:
+            return error
+        if len(sheets) == 1:
+            digest = frame_digest(next(iter(sheets.values())))
+        else:
+            digest = "\n\n".join(f"Sheet: {name}\n{frame_digest(df)}" for name, df in sheets.items())
+    write_digest(file_path, digest)
+    return digest
+
+
+def _extract_excel(file_path: str) -> str:
+    return _extract_tabular(file_path, "[Excel Parsing Error: could not read workbook]")
 
 
 def _extract_csv(file_path: str) -> str:
-    try:
-        # Try default (UTF-8)
-        df = pd.read_csv(file_path)
-    except UnicodeDecodeError:
-        try:
-            # Try common fallback encodings
-            df = pd.read_csv(file_path, encoding='latin1')
-        except Exception as e:
-            return f"[CSV Parsing Error: {str(e)}]"
-    except Exception as e:
-        return f"[CSV Parsing Error: {str(e)}]"
-        
-    return f"Columns: {', '.join(df.columns.tolist())}\n\n{df.to_string(max_rows=200)}"
+    return _extract_tabular(file_path, "[CSV Parsing Error: could not read file]")
 
 
 def _extract_docx(file_path: str) -> str:
@@ -35,18 +35,11 @@ class PriceForecaster:
             
             ext = os.path.splitext(self.file_path)[1].lower()
             if ext == '.csv':
-                try:
-                    self.df = pd.read_csv(self.file_path)
-                except Exception:
-                    self.df = pd.read_csv(self.file_path, encoding='latin1')
+                from app.services.file_parser import read_csv
+                self.df = read_csv(self.file_path)
             else:
-                try:
-                    self.df = pd.read_excel(self.file_path)
-                except Exception:
-                    try:
-                        self.df = pd.read_excel(self.file_path, engine='openpyxl')
-                    except Exception:
-                        self.df = pd.read_excel(self.file_path, engine='xlrd')
+                from app.services.excel import read_sheet
+                self.df = read_sheet(self.file_path)
 
         # Robust case-insensitive column search
         if self.date_column not in self.df.columns:
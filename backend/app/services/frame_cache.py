@@ -0,0 +1,97 @@
+"""Process-wide LRU cache of parsed DataFrames.
+
+Entries are keyed by (file_id, mtime, size) so a rewritten file (e.g. by
+/refine) is never served stale. Total memory is bounded by
+FRAME_CACHE_MAX_MB, measured with DataFrame.memory_usage(deep=True).
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def _copy_on_write() -> bool:
+    """Copy-on-Write is always on from pandas 3; on older versions only if the app enabled it."""
+    return int(pd.__version__.split(".")[0]) >= 3 or pd.get_option("mode.copy_on_write") is True
+
+
+def _detached(df: pd.DataFrame) -> pd.DataFrame:
+    """A copy whose mutation can never reach df: shallow under Copy-on-Write, deep otherwise."""
+    return df.copy(deep=not _copy_on_write())
+
+
+def _frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+class FrameCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, int, int], tuple[pd.DataFrame, int]] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(file_path: str) -> tuple[str, int, int] | None:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return Path(file_path).stem, stat.st_mtime_ns, stat.st_size
+
+    def get(self, file_path: str) -> pd.DataFrame | None:
+        """Return a copy of the cached frame for file_path, if fresh; callers may mutate it freely."""
+        key = self._key(file_path)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return _detached(entry[0])
+
+    def put(self, file_path: str, df: pd.DataFrame) -> None:
+        key = self._key(file_path)
+        if key is None:
+            return
+        size = _frame_bytes(df)
+        if size > self.max_bytes:
+            logger.info(f"Frame for {key[0]} ({size} bytes) exceeds cache budget, not caching")
+            return
+        with self._lock:
+            self._drop_file(key[0])
+            # The caller keeps using df, so the cache holds its own copy
+            self._entries[key] = (_detached(df), size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+
+    def invalidate(self, file_id: str) -> None:
+        with self._lock:
+            self._drop_file(file_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def _drop_file(self, file_id: str) -> None:
+        for key in [k for k in self._entries if k[0] == file_id]:
+            _, size = self._entries.pop(key)
+            self._total_bytes -= size
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+
+frame_cache = FrameCache(max_bytes=settings.FRAME_CACHE_MAX_MB * 1024 * 1024)
@@ -0,0 +1,255 @@
+"""Background ingestion jobs for /upload.
+
+An upload is persisted first and then ingested off the event loop. Each job
+runs on the ingestion pool and streams segments (pages for PDFs, sheets or
+row blocks for tables) through chunking into an EmbeddingExecutor, which
+embeds each full token-bounded batch right away, so early chunks are embedded
+while later pages are still being parsed.
+Progress is tracked per stage and served by /jobs/{job_id}.
+"""
+
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from app.core.config import settings
+from app.core.database import files_table, File
+from app.services.blobs import add_blob_ref
+from app.services.chunker import chunk_text, open_vectorstore, delete_vectors, sync_vectorstore
+from app.services.columnar import remove_sidecar
+from app.services.embedder import EmbeddingExecutor
+from app.services.file_index import register_file_path
+from app.services.file_parser import iter_text_segments, get_file_extension
+from app.services.lexical import save_lexical_index
+from app.services.retrieval_cache import invalidate_vectors
+from app.services.sniffer import get_reader_config
+from app.services.table_chunker import TABLE_EXTENSIONS, iter_table_chunks
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("parse", "chunk", "embed")
+MAX_JOBS = 1000  # finished jobs are forgotten oldest-first beyond this
+
+_jobs: OrderedDict[str, dict] = OrderedDict()
+_lock = threading.Lock()
+
+_ingest_pool = ThreadPoolExecutor(max_workers=settings.INGEST_WORKERS, thread_name_prefix="ingest")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def create_job(file_id: str, filename: str) -> dict:
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "file_id": file_id,
+        "filename": filename,
+        "status": "queued",
+        "stages": {stage: {"status": "pending", "done": 0, "total": None} for stage in STAGES},
+        "num_chunks": 0,
+        "preview": "",
+        "embedding_cache_hit_rate": None,
+        "error": None,
+        "created_at": _now(),
+        "updated_at": _now(),
+    }
+    with _lock:
+        _jobs[job["job_id"]] = job
+        while len(_jobs) > MAX_JOBS:
+            oldest = next(iter(_jobs))
+            if _jobs[oldest]["status"] not in ("completed", "failed"):
+                break
+            _jobs.popitem(last=False)
+    return job
+
+
+def get_job(job_id: str) -> dict | None:
+    with _lock:
+        job = _jobs.get(job_id)
+        # Copy so readers never see a half-applied update
+        return {**job, "stages": {k: dict(v) for k, v in job["stages"].items()}} if job else None
+
+
+def _update(job: dict, stage: str | None = None, **fields) -> None:
+    with _lock:
+        target = job["stages"][stage] if stage else job
+        target.update(fields)
+        job["updated_at"] = _now()
+
+
+def _advance(job: dict, stage: str, n: int) -> None:
+    with _lock:
+        job["stages"][stage]["done"] += n
+        job["updated_at"] = _now()
+
+
+def submit_ingestion(job: dict, file_path: str, sha256: str) -> None:
+    _ingest_pool.submit(_run_ingestion, job, file_path, sha256)
+
+
+def _run_ingestion(job: dict, file_path: str, sha256: str) -> None:
+    file_id = job["file_id"]
+    _update(job, status="running")
+    try:
+        num_chunks, preview = _ingest(job, file_path)
+    except Exception as e:
+        logger.exception(f"Ingestion job {job['job_id']} for {file_id} failed")
+        with _lock:
+            for stage in job["stages"].values():
+                if stage["status"] != "completed":
+                    stage["status"] = "failed"
+        _update(job, status="failed", error=str(e))
+        # Clean up failed file and any partially written vectors
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        delete_vectors(file_id)
+        return
+
+    vector_id = file_id
+    blob = add_blob_ref(sha256, file_id, file_path, vector_id, num_chunks)
+    if blob["file_path"] != file_path:
+        # An identical upload overlapped this one and finished first: alias its blob and vectors
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        remove_sidecar(file_path)
+        delete_vectors(file_id)
+        file_path, vector_id, num_chunks = blob["file_path"], blob["vector_id"], blob["num_chunks"]
+        logger.info(f"Ingestion job {job['job_id']}: {file_id} duplicates {vector_id}, aliased")
+
+    files_table.insert({
+        "file_id": file_id,
+        "filename": job["filename"],
+        "file_type": job["filename"].rsplit(".", 1)[-1],
+        "num_chunks": num_chunks,
+        "uploaded_at": _now(),
+        "file_size": os.path.getsize(file_path),
+        "file_path": file_path,
+        "reader_config": get_reader_config(file_path) if get_file_extension(file_path) == ".csv" else None,
+        "sha256": sha256,
+        "vector_id": vector_id,
+    })
+    register_file_path(file_id, file_path)
+    _update(job, status="completed", num_chunks=num_chunks, preview=preview)
+
+
+def _iter_segments(file_path: str, filename: str):
+    """Yield (segment text, its chunks). Tables are chunked by rows and aggregates, everything else by text."""
+    if get_file_extension(file_path) in TABLE_EXTENSIONS:
+        for chunks in iter_table_chunks(file_path, filename):
+            yield "\n\n".join(chunks[:3]), chunks
+        return
+    for segment in iter_text_segments(file_path):
+        yield segment, chunk_text(segment) if segment.strip() else []
+
+
+def _ingest(job: dict, file_path: str) -> tuple[int, str]:
+    store = open_vectorstore(job["file_id"])
+    executor = EmbeddingExecutor(
+        store,
+        on_batch=lambda n: _advance(job, "embed", n),
+        metadata={"file_id": job["file_id"]},
+        vector_id=job["file_id"],
+    )
+    all_chunks: list[str] = []
+    preview = ""
+
+    _update(job, "parse", status="running")
+    _update(job, "chunk", status="running")
+    _update(job, "embed", status="running")
+    try:
+        for segment, chunks in _iter_segments(file_path, job["filename"]):
+            _advance(job, "parse", 1)
+            if len(preview) < 500:
+                preview += segment[:500 - len(preview)]
+            if not chunks:
+                continue
+            all_chunks.extend(chunks)
+            _advance(job, "chunk", len(chunks))
+            # Full batches start embedding while later segments are still being parsed
+            executor.submit(chunks)
+        num_chunks = len(all_chunks)
+        _update(job, "parse", status="completed", total=job["stages"]["parse"]["done"])
+        _update(job, "chunk", status="completed", total=num_chunks)
+        # Repeated chunks are stored once
+        _update(job, "embed", total=len(set(all_chunks)))
+        if num_chunks == 0:
+            raise ValueError("Could not extract text from file")
+        executor.close()
+    finally:
+        executor.cancel()
+    save_lexical_index(job["file_id"], all_chunks)
+    invalidate_vectors(job["file_id"])
+    _update(job, "embed", status="completed")
+    _update(job, embedding_cache_hit_rate=store.embeddings.hit_rate)
+    logger.info(f"Ingested {num_chunks} chunks for {job['file_id']}, embedding cache hit rate {store.embeddings.hit_rate:.0%}")
+    return num_chunks, preview
+
+
+# Re-index jobs for one file run one at a time; a fixed set of locks striped by
+# file_id, so nothing is left behind per file
+_reindex_locks = [threading.Lock() for _ in range(32)]
+
+
+def submit_reindex(job: dict) -> None:
+    _ingest_pool.submit(_run_reindex, job)
+
+
+def _reindex_vector_id(file_id: str, vector_id: str) -> str:
+    """The store a modified file is re-indexed into.
+
+    A store that other records still read (an alias's original, or an original
+    with aliases) must stay intact, so the file moves to a store of its own.
+    """
+    others = File.file_id != file_id
+    if vector_id == file_id and not files_table.contains((File.vector_id == vector_id) & others):
+        return vector_id
+    if not files_table.contains((File.vector_id == file_id) & others):
+        return file_id
+    return f"{file_id}-{uuid.uuid4().hex[:8]}"
+
+
+def _run_reindex(job: dict) -> None:
+    """Re-chunk a file changed in place and sync its vectors, embedding only new chunks."""
+    file_id = job["file_id"]
+    with _reindex_locks[hash(file_id) % len(_reindex_locks)]:
+        _update(job, status="running")
+        try:
+            doc = files_table.get(File.file_id == file_id)
+            if doc is None:
+                raise ValueError(f"File {file_id} no longer exists")
+            old_vector_id = doc.get("vector_id") or file_id
+            vector_id = _reindex_vector_id(file_id, old_vector_id)
+
+            _update(job, "parse", status="running")
+            chunks: list[str] = []
+            preview = ""
+            for segment, segment_chunks in _iter_segments(doc["file_path"], doc["filename"]):
+                _advance(job, "parse", 1)
+                if len(preview) < 500:
+                    preview += segment[:500 - len(preview)]
+                chunks.extend(segment_chunks)
+            _update(job, "parse", status="completed", total=job["stages"]["parse"]["done"])
+            _update(job, "chunk", status="completed", done=len(chunks), total=len(chunks))
+            if not chunks:
+                raise ValueError("Could not extract text from file")
+
+            _update(job, "embed", status="running")
+            added, deleted = sync_vectorstore(vector_id, chunks, on_batch=lambda n: _advance(job, "embed", n))
+            _update(job, "embed", status="completed", total=added)
+        except Exception as e:
+            logger.exception(f"Re-index job {job['job_id']} for {file_id} failed")
+            with _lock:
+                for stage in job["stages"].values():
+                    if stage["status"] != "completed":
+                        stage["status"] = "failed"
+            _update(job, status="failed", error=str(e))
+            return
+
+        files_table.update({"vector_id": vector_id, "num_chunks": len(chunks)}, File.file_id == file_id)
+        _update(job, status="completed", num_chunks=len(chunks), preview=preview)
+        logger.info(f"Re-indexed {file_id} into {vector_id}: {added} chunks embedded, {deleted} deleted")
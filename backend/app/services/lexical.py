@@ -0,0 +1,125 @@
+"""BM25 inverted index over a file's chunks.
+
+Built once at ingest and stored as JSON next to the other derived artifacts.
+Exact tokens such as column names, SKUs and IDs match here even when their
+embeddings are unremarkable, and a lexical search needs no API call.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.vector_pool import HandlePool
+
+logger = logging.getLogger(__name__)
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"\w+(?:[-./]\w+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from had has have how i in is it its me my of on or "
+    "our show tell that the their there these this to was we were what when where which who why "
+    "will with you your please give list".split()
+)
+
+_pool = HandlePool(settings.VECTORSTORE_POOL_SIZE, settings.VECTORSTORE_POOL_IDLE_SECONDS)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens; compound tokens like 'SKU-1042' also yield their parts."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(p for p in re.split(r"[-./]", token) if p)
+    return tokens
+
+
+def query_terms(text: str) -> list[str]:
+    return list(dict.fromkeys(t for t in tokenize(text) if t not in _STOPWORDS))
+
+
+class LexicalIndex:
+    def __init__(self, chunks: list[str], postings: dict[str, list[list[int]]], doc_len: list[int]):
+        self.chunks = chunks
+        self.postings = postings
+        self.doc_len = np.asarray(doc_len, dtype=np.float64)
+        self.avgdl = float(self.doc_len.mean()) if len(doc_len) else 0.0
+
+    @classmethod
+    def build(cls, chunks: list[str]) -> "LexicalIndex":
+        postings: dict[str, list[list[int]]] = {}
+        doc_len = []
+        for doc, chunk in enumerate(chunks):
+            tokens = tokenize(chunk)
+            doc_len.append(len(tokens))
+            counts: dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append([doc, tf])
+        return cls(chunks, postings, doc_len)
+
+    def search(self, query: str, k: int) -> tuple[list[tuple[int, float]], bool]:
+        """Top-k (chunk index, BM25 score) pairs, and whether the best hit contains every query term."""
+        terms = [t for t in query_terms(query) if t in self.postings]
+        if not terms or not self.chunks:
+            return [], False
+        n = len(self.chunks)
+        scores = np.zeros(n)
+        matched = np.zeros(n, dtype=np.int32)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len / (self.avgdl or 1.0))
+        for term in terms:
+            docs, tfs = np.asarray(self.postings[term], dtype=np.float64).T
+            docs = docs.astype(np.int64)
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tfs * (BM25_K1 + 1) / (tfs + norm[docs])
+            matched[docs] += 1
+        top = np.argsort(-scores)[:k]
+        hits = [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+        all_terms = bool(hits) and bool(matched[hits[0][0]] == len(query_terms(query)))
+        return hits, all_terms
+
+    def to_dict(self) -> dict:
+        return {"chunks": self.chunks, "postings": self.postings, "doc_len": self.doc_len.astype(int).tolist()}
+
+
+def _index_path(vector_id: str) -> str:
+    return os.path.join(settings.LEXICAL_INDEX_DIR, f"{vector_id}.json")
+
+
+def save_lexical_index(vector_id: str, chunks: list[str]) -> LexicalIndex:
+    index = LexicalIndex.build(chunks)
+    os.makedirs(settings.LEXICAL_INDEX_DIR, exist_ok=True)
+    path = _index_path(vector_id)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index.to_dict(), f)
+    os.replace(tmp_path, path)
+    _pool.invalidate(vector_id)
+    return index
+
+
+def load_lexical_index(vector_id: str) -> LexicalIndex | None:
+    path = _index_path(vector_id)
+    if not os.path.exists(path):
+        return None
+
+    def _open() -> LexicalIndex:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return LexicalIndex(data["chunks"], data["postings"], data["doc_len"])
+
+    return _pool.get(vector_id, _open)
+
+
+def delete_lexical_index(vector_id: str) -> None:
+    _pool.invalidate(vector_id)
+    if os.path.exists(_index_path(vector_id)):
+        os.remove(_index_path(vector_id))
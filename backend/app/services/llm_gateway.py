@@ -0,0 +1,174 @@
+"""Single gateway for chat-completion calls.
+
+Every service sends its OpenAI chat calls through here. The gateway runs
+one event loop on a background thread. That loop holds one pooled
+AsyncOpenAI client per API key, so connections are reused instead of a
+client being built per call. A global semaphore caps in-flight calls at
+LLM_MAX_CONCURRENCY. Transient errors are retried with full-jitter
+backoff. Each call's latency and token usage are recorded per caller.
+
+Async code awaits acomplete(). Code already running in a worker thread
+(the analysis routes and the streaming chat generator) calls complete() or
+stream(); these block only that thread, never the server's event loop.
+"""
+
+import asyncio
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Iterator
+
+import openai
+from openai import AsyncOpenAI
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+LATENCY_WINDOW = 1000  # recent calls kept per caller for the latency percentiles
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+_semaphore: asyncio.Semaphore | None = None
+_clients: dict[str, AsyncOpenAI] = {}  # only touched on the gateway loop
+
+_stats: dict[str, dict] = {}
+_stats_lock = threading.Lock()
+_DONE = object()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _semaphore
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+            _semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+            _loop = loop
+        return _loop
+
+
+def _client(api_key: str | None) -> AsyncOpenAI:
+    key = api_key or settings.OPENAI_API_KEY
+    client = _clients.get(key)
+    if client is None:
+        # Retries happen here, under the semaphore, not inside the SDK
+        client = AsyncOpenAI(api_key=key, max_retries=0, timeout=settings.LLM_TIMEOUT_SECONDS)
+        _clients[key] = client
+    return client
+
+
+def _record(caller: str, model: str, seconds: float, usage: Any = None, retries: int = 0, error: bool = False) -> None:
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    with _stats_lock:
+        entry = _stats.setdefault(caller, {
+            "model": model, "calls": 0, "errors": 0, "retries": 0,
+            "prompt_tokens": 0, "completion_tokens": 0, "latencies": deque(maxlen=LATENCY_WINDOW),
+        })
+        entry["model"] = model
+        entry["calls"] += 1
+        entry["errors"] += int(error)
+        entry["retries"] += retries
+        entry["prompt_tokens"] += prompt
+        entry["completion_tokens"] += completion
+        entry["latencies"].append(seconds)
+    logger.debug(f"LLM call {caller} ({model}): {seconds:.2f}s, {prompt}+{completion} tokens, {retries} retries")
+
+
+async def _open(caller: str, api_key: str | None, kwargs: dict) -> tuple[Any, int, float]:
+    """Run create() with retries. Returns (response, retries, start time of the successful attempt).
+
+    The semaphore is held for the attempt only, so calls backing off don't hold a slot.
+    """
+    client = _client(api_key)
+    attempt = 0
+    while True:
+        await _semaphore.acquire()
+        start = time.perf_counter()
+        try:
+            return await client.chat.completions.create(**kwargs), attempt, start
+        except RETRYABLE_ERRORS as e:
+            _semaphore.release()
+            attempt += 1
+            if attempt > settings.LLM_MAX_RETRIES:
+                _record(caller, kwargs.get("model", ""), time.perf_counter() - start, retries=attempt - 1, error=True)
+                raise
+            # Full jitter keeps concurrent callers from retrying in lockstep
+            delay = random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+            logger.warning(f"LLM call {caller} failed ({e}); retry {attempt} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        except BaseException:
+            _semaphore.release()
+            _record(caller, kwargs.get("model", ""), time.perf_counter() - start, retries=attempt, error=True)
+            raise
+
+
+async def _complete(caller: str, api_key: str | None, kwargs: dict) -> Any:
+    response, retries, start = await _open(caller, api_key, kwargs)
+    _semaphore.release()
+    _record(caller, kwargs.get("model", ""), time.perf_counter() - start, response.usage, retries)
+    return response
+
+
+async def _stream_into(out: queue.Queue, caller: str, api_key: str | None, kwargs: dict) -> None:
+    """Push the stream's chunks onto out, then _DONE. The slot is held until the stream ends."""
+    try:
+        stream, retries, start = await _open(caller, api_key, kwargs)
+        usage, error = None, True
+        try:
+            async for chunk in stream:
+                # With include_usage, the last chunk carries the usage and no choices
+                usage = getattr(chunk, "usage", None) or usage
+                out.put(chunk)
+            error = False
+        finally:
+            _semaphore.release()
+            _record(caller, kwargs.get("model", ""), time.perf_counter() - start, usage, retries, error)
+    finally:
+        out.put(_DONE)
+
+
+async def acomplete(*, caller: str = "default", api_key: str | None = None, **kwargs: Any) -> Any:
+    """chat.completions.create(**kwargs) from async code, without blocking the caller's loop."""
+    future = asyncio.run_coroutine_threadsafe(_complete(caller, api_key, kwargs), _get_loop())
+    return await asyncio.wrap_future(future)
+
+
+def complete(*, caller: str = "default", api_key: str | None = None, **kwargs: Any) -> Any:
+    """chat.completions.create(**kwargs) from a worker thread. Never call it on an event loop."""
+    return asyncio.run_coroutine_threadsafe(_complete(caller, api_key, kwargs), _get_loop()).result()
+
+
+def stream(*, caller: str = "default", api_key: str | None = None, **kwargs: Any) -> Iterator[Any]:
+    """Iterate the chunks of a streamed completion from a worker thread."""
+    kwargs = {**kwargs, "stream": True, "stream_options": {"include_usage": True}}
+    out: queue.Queue = queue.Queue()
+    future = asyncio.run_coroutine_threadsafe(_stream_into(out, caller, api_key, kwargs), _get_loop())
+    try:
+        while (chunk := out.get()) is not _DONE:
+            yield chunk
+        future.result()  # re-raise a failed call
+    finally:
+        # The consumer stopped early (e.g. the client disconnected): close the stream
+        future.cancel()
+
+
+def llm_stats() -> dict[str, dict]:
+    """Per caller: model, call, error and retry counts, token totals, and recent latency percentiles (ms)."""
+    with _stats_lock:
+        snapshot = {caller: {**entry, "latencies": sorted(entry["latencies"])} for caller, entry in _stats.items()}
+    for entry in snapshot.values():
+        latencies = entry.pop("latencies")
+        for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95)):
+            entry[name] = round(latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000, 1) if latencies else None
+    return snapshot
@@ -0,0 +1,211 @@
+"""Multi-file merge for /upload-multi.
+
+Inputs are parsed concurrently. Join keys are chosen from the columns every
+file shares, using per-file uniqueness, null rate and value overlap between
+files. The output row count is computed exactly from per-key counts before
+anything is joined, and a merge that would exceed MERGE_MAX_ROWS or
+MERGE_MAX_MB is refused instead of exhausting memory. When the keys are
+unique in every file, all files are aligned on them in one pass.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.excel import read_sheet
+from app.services.file_parser import get_file_extension, read_csv
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_COLUMNS = 3
+MIN_KEY_OVERLAP = 0.05  # share of the smaller file's key values found in the other file
+MIN_KEY_UNIQUENESS = 0.5  # a key must be (nearly) unique in at least one file, else the join is many-to-many
+
+
+class MergeTooLargeError(ValueError):
+    pass
+
+
+@dataclass
+class MergePlan:
+    strategy: str  # "join", "stack" or "side_by_side"
+    keys: list[str]
+    estimated_rows: int
+    estimated_mb: float
+
+
+def _parse_table(file_path: str) -> pd.DataFrame | None:
+    ext = get_file_extension(file_path)
+    if ext == ".csv":
+        return read_csv(file_path)
+    if ext in (".xlsx", ".xls"):
+        return read_sheet(file_path)
+    return None
+
+
+def parse_tables(file_paths: list[str]) -> list[pd.DataFrame | None]:
+    """Parse the files concurrently, in order; None for non-tabular files.
+
+    pandas' CSV parser releases the GIL, so threads overlap the parsing itself.
+    """
+    workers = min(len(file_paths), settings.MERGE_PARSE_WORKERS)
+    if workers <= 1:
+        return [_parse_table(path) for path in file_paths]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="merge-parse") as pool:
+        return list(pool.map(_parse_table, file_paths))
+
+
+def _shared_columns(dfs: list[pd.DataFrame]) -> list[str]:
+    """Columns present in every frame, in the first frame's order."""
+    common = set.intersection(*(set(df.columns) for df in dfs))
+    return [col for col in dfs[0].columns if col in common]
+
+
+def _key_score(dfs: list[pd.DataFrame], col: str) -> float:
+    """How key-like col is: unique in some file, rarely null, and shared in value across files. 0 if unusable."""
+    uniqueness, null_rates, value_sets = [], [], []
+    for df in dfs:
+        values = df[col]
+        non_null = int(values.notna().sum())
+        if non_null == 0:
+            return 0.0
+        uniqueness.append(values.nunique() / non_null)
+        null_rates.append(1 - non_null / len(df))
+        value_sets.append(pd.Index(values.dropna().unique()))
+    if pd.api.types.is_float_dtype(dfs[0][col]) and max(uniqueness) > 0.5:
+        return 0.0  # a continuous measure, not an identifier
+    overlaps = []
+    for left, right in zip(value_sets, value_sets[1:]):
+        overlaps.append(len(left.intersection(right)) / max(min(len(left), len(right)), 1))
+    overlap = min(overlaps)
+    if overlap < MIN_KEY_OVERLAP:
+        return 0.0
+    return overlap * max(uniqueness) * (1 - max(null_rates))
+
+
+def choose_join_keys(dfs: list[pd.DataFrame]) -> list[str]:
+    """The shared columns to join on, best single key first; empty if none is usable.
+
+    The best-scoring column is extended with the next best ones while that makes
+    the key unique in more files, so e.g. (store, date) beats store alone.
+    """
+    scores = {col: _key_score(dfs, col) for col in _shared_columns(dfs)}
+    ranked = [col for col, score in sorted(scores.items(), key=lambda item: -item[1]) if score > 0]
+    if not ranked:
+        return []
+
+    def unique_files(keys: list[str]) -> int:
+        return sum(not df.duplicated(subset=keys).any() for df in dfs)
+
+    keys = ranked[:1]
+    for col in ranked[1:]:
+        if len(keys) >= MAX_KEY_COLUMNS or unique_files(keys) == len(dfs):
+            break
+        if unique_files(keys + [col]) > unique_files(keys):
+            keys.append(col)
+    if max(1 - df.duplicated(subset=keys).mean() for df in dfs) < MIN_KEY_UNIQUENESS:
+        logger.info(f"Shared columns {keys} repeat in every file; not joining on them")
+        return []
+    return keys
+
+
+def _key_counts(df: pd.DataFrame, keys: list[str]) -> pd.Series:
+    return df.groupby(keys, dropna=False, sort=False).size()
+
+
+def _row_bytes(df: pd.DataFrame) -> float:
+    return float(df.memory_usage(deep=True, index=False).sum()) / max(len(df), 1)
+
+
+def plan_merge(dfs: list[pd.DataFrame]) -> MergePlan:
+    """Choose a strategy and compute the output size without building it."""
+    columns = [set(df.columns) for df in dfs]
+    if all(c == columns[0] for c in columns):
+        total_bytes = sum(float(df.memory_usage(deep=True, index=False).sum()) for df in dfs)
+        return MergePlan("stack", [], sum(len(df) for df in dfs), total_bytes / 2**20)
+
+    row_bytes = sum(_row_bytes(df) for df in dfs)
+
+    keys = choose_join_keys(dfs)
+    if not keys:
+        rows = max(len(df) for df in dfs)
+        return MergePlan("side_by_side", [], rows, rows * row_bytes / 2**20)
+
+    # An outer join yields, per key value, the product of its row counts in the files containing it
+    counts = pd.concat([_key_counts(df, keys) for df in dfs], axis=1).fillna(1)
+    rows = int(counts.prod(axis=1).sum())
+    return MergePlan("join", keys, rows, rows * row_bytes / 2**20)
+
+
+def _check_size(plan: MergePlan) -> None:
+    if plan.estimated_rows > settings.MERGE_MAX_ROWS or plan.estimated_mb > settings.MERGE_MAX_MB:
+        keys = f" on {', '.join(plan.keys)}" if plan.keys else ""
+        hint = " The join keys repeat too often in several files." if plan.keys else ""
+        raise MergeTooLargeError(
+            f"Merging{keys} would produce about {plan.estimated_rows:,} rows (~{plan.estimated_mb:,.0f} MB), "
+            f"over the limit of {settings.MERGE_MAX_ROWS:,} rows / {settings.MERGE_MAX_MB:,} MB.{hint}"
+        )
+
+
+def _disambiguate(dfs: list[pd.DataFrame], names: list[str], keys: list[str]) -> list[pd.DataFrame]:
+    """Suffix non-key columns that appear in several files with their file's name.
+
+    Files sharing a stem (data.csv, data.xlsx) are told apart by their position,
+    so no two output columns end up with the same name.
+    """
+    seen: dict[str, int] = {}
+    for df in dfs:
+        for col in df.columns:
+            if col not in keys:
+                seen[col] = seen.get(col, 0) + 1
+    stems = [Path(name).stem for name in names]
+    labels = [stem if stems.count(stem) == 1 else f"{stem}_{i + 1}" for i, stem in enumerate(stems)]
+    used = {col for df in dfs for col in df.columns}
+    renamed = []
+    for i, (df, label) in enumerate(zip(dfs, labels)):
+        clashes = {}
+        if i:  # The first file keeps its column names, as before
+            for col in df.columns:
+                if seen.get(col, 0) > 1:
+                    new = f"{col}_{label}"
+                    while new in used:
+                        new += f"_{i + 1}"
+                    used.add(new)
+                    clashes[col] = new
+        renamed.append(df.rename(columns=clashes) if clashes else df)
+    return renamed
+
+
+def merge_tables(dfs: list[pd.DataFrame], names: list[str]) -> tuple[pd.DataFrame, MergePlan]:
+    """Merge the frames per plan_merge(). Raises MergeTooLargeError past the memory guard."""
+    plan = plan_merge(dfs)
+    logger.info(
+        f"Merge plan: {plan.strategy} on {plan.keys or '-'}, ~{plan.estimated_rows} rows, ~{plan.estimated_mb:.0f} MB"
+    )
+    _check_size(plan)
+
+    if plan.strategy == "stack":
+        return pd.concat(dfs, ignore_index=True, sort=False), plan
+    dfs = _disambiguate(dfs, names, plan.keys)
+    if plan.strategy == "side_by_side":
+        merged = pd.concat([df.reset_index(drop=True) for df in dfs], axis=1)
+        return merged.loc[:, ~merged.columns.duplicated()], plan
+
+    keys = plan.keys
+    if all(not df.duplicated(subset=keys).any() for df in dfs):
+        # Unique keys everywhere: one aligned pass over the union of key values
+        merged = pd.concat([df.set_index(keys) for df in dfs], axis=1, join="outer", sort=False)
+        return merged.reset_index(), plan
+
+    # Many-to-many keys: hash joins, largest file first, sizes already bounded by the plan
+    order = np.argsort([-len(df) for df in dfs], kind="stable")
+    merged = dfs[order[0]]
+    for i in order[1:]:
+        merged = pd.merge(merged, dfs[i], on=keys, how="outer")
+    columns = keys + [col for df in dfs for col in df.columns if col not in keys]
+    return merged[columns], plan
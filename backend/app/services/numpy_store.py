@@ -0,0 +1,242 @@
+"""In-process vector store on a memory-mapped, quantized matrix.
+
+A drop-in for Chroma behind create_vectorstore/load_vectorstore, selected
+with VECTORSTORE_BACKEND=numpy. A store directory holds:
+
+    meta.json    dim and storage dtype
+    vectors.bin  one unit-normalized row per chunk, float16 or int8
+    scales.f32   per-row dequantization scale (int8 only)
+    docs.jsonl   id, text and metadata per chunk; line n is row n, written
+                 after the row, so its line count is the row count
+
+Rows are appended as batches are embedded and read back through a memory
+map, so a store costs its page-cache footprint rather than a client and a
+SQLite connection. Top-k is one matrix-vector product over every row.
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Iterable
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DTYPES = {"float16": np.float16, "int8": np.int8}
+
+# Handles on the same directory (an ingestion handle and a pooled query handle) share a lock;
+# a fixed set of locks striped by path, so nothing is left behind per store
+_path_locks = [threading.Lock() for _ in range(64)]
+
+
+def _path_lock(path: str) -> threading.Lock:
+    return _path_locks[hash(os.path.abspath(path)) % len(_path_locks)]
+
+
+class NumpyVectorStore(VectorStore):
+    def __init__(self, path: str, embedding_function: Embeddings, dtype: str | None = None):
+        self.path = path
+        self._embedding = embedding_function
+        self._meta_path = os.path.join(path, "meta.json")
+        self._vectors_path = os.path.join(path, "vectors.bin")
+        self._scales_path = os.path.join(path, "scales.f32")
+        self._docs_path = os.path.join(path, "docs.jsonl")
+        self._lock = _path_lock(path)
+        self._dtype_name = dtype or settings.VECTORSTORE_DTYPE
+        self._dim: int | None = None
+        self._docs: list[dict] | None = None
+        self._docs_bytes = 0
+        self._mmap: np.ndarray | None = None
+        self._scales: np.ndarray | None = None
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    @property
+    def _dtype(self):
+        return DTYPES[self._dtype_name]
+
+    def _load(self) -> None:
+        """Bring the in-memory docs up to date, reading only lines appended since the last load."""
+        size = os.path.getsize(self._docs_path) if os.path.exists(self._docs_path) else 0
+        if self._docs is not None and size == self._docs_bytes:
+            return
+        if self._dim is None and os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self._dim, self._dtype_name = meta["dim"], meta["dtype"]
+        if self._docs is None or size < self._docs_bytes:
+            # First load, or the store was rewritten by delete()
+            self._docs, self._docs_bytes, self._mmap, self._scales = [], 0, None, None
+        if size == self._docs_bytes:
+            return
+        with open(self._docs_path, "rb") as f:
+            f.seek(self._docs_bytes)
+            data = f.read()
+        # A crash mid-append can leave a partial last line; it is overwritten by the next append
+        data = data[:data.rfind(b"\n") + 1]
+        self._docs.extend(json.loads(line) for line in data.splitlines())
+        self._docs_bytes += len(data)
+
+    def _truncate_to_docs(self) -> None:
+        """Drop rows a crashed append wrote without their docs line, so rows stay aligned."""
+        rows = len(self._docs)
+        row_bytes = self._dim * np.dtype(self._dtype).itemsize
+        paths = [(self._vectors_path, rows * row_bytes), (self._scales_path, rows * 4)]
+        for path, length in paths + [(self._docs_path, self._docs_bytes)]:
+            if os.path.exists(path) and os.path.getsize(path) > length:
+                os.truncate(path, length)
+
+    def _matrix(self) -> tuple[np.ndarray, np.ndarray | None]:
+        rows = len(self._docs)
+        if self._mmap is None or self._mmap.shape[0] != rows:
+            self._mmap = np.memmap(self._vectors_path, dtype=self._dtype, mode="r", shape=(rows, self._dim))
+            if self._dtype_name == "int8":
+                self._scales = np.memmap(self._scales_path, dtype=np.float32, mode="r", shape=(rows,))
+        return self._mmap, self._scales
+
+    def _encode(self, vectors: list[list[float]]) -> tuple[np.ndarray, np.ndarray | None]:
+        array = np.asarray(vectors, dtype=np.float32)
+        array /= np.maximum(np.linalg.norm(array, axis=1, keepdims=True), 1e-12)
+        if self._dtype_name == "int8":
+            scales = np.maximum(np.abs(array).max(axis=1), 1e-12) / 127.0
+            return np.round(array / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return array.astype(np.float16), None
+
+    def add_texts(
+        self, texts: Iterable[str], metadatas: list[dict] | None = None, ids: list[str] | None = None, **kwargs: Any
+    ) -> list[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        # Embed outside the lock so concurrent batches only serialize on the append
+        return self.add_embeddings(texts, self._embedding.embed_documents(texts), metadatas=metadatas, ids=ids)
+
+    def add_embeddings(
+        self, texts: list[str], embedded: list[list[float]], metadatas: list[dict] | None = None,
+        ids: list[str] | None = None,
+    ) -> list[str]:
+        """add_texts() for vectors the caller already computed."""
+        if not texts:
+            return []
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        with self._lock:
+            self._load()
+            # An existing store keeps the dtype it was created with
+            vectors, scales = self._encode(embedded)
+            if self._dim is None:
+                os.makedirs(self.path, exist_ok=True)
+                self._dim = vectors.shape[1]
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": self._dim, "dtype": self._dtype_name}, f)
+            self._truncate_to_docs()
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            if scales is not None:
+                with open(self._scales_path, "ab") as f:
+                    f.write(scales.tobytes())
+            docs = [{"id": i, "text": t, "metadata": m or {}} for i, t, m in zip(ids, texts, metadatas)]
+            # The docs line is written last: a row exists once its docs line does
+            data = "".join(json.dumps(d) + "\n" for d in docs).encode("utf-8")
+            with open(self._docs_path, "ab") as f:
+                f.write(data)
+            self._docs.extend(docs)
+            self._docs_bytes += len(data)
+        return ids
+
+    def _mask(self, where: dict | None) -> np.ndarray | None:
+        if not where:
+            return None
+        return np.fromiter(
+            (all(d["metadata"].get(key) == value for key, value in where.items()) for d in self._docs),
+            dtype=bool,
+            count=len(self._docs),
+        )
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: dict | None = None, **kwargs: Any
+    ) -> list[tuple[Document, float]]:
+        q = np.asarray(self._embedding.embed_query(query), dtype=np.float32)
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+        with self._lock:
+            self._load()
+            if not self._docs:
+                return []
+            matrix, scales = self._matrix()
+            scores = matrix @ q.astype(matrix.dtype) if self._dtype_name == "float16" else (matrix @ q) * scales
+            scores = scores.astype(np.float32)
+            mask = self._mask(filter)
+            if mask is not None:
+                scores[~mask] = -np.inf
+            k = min(k, len(scores) if mask is None else int(mask.sum()))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            docs = self._docs
+        return [
+            (Document(page_content=docs[i]["text"], metadata=docs[i]["metadata"]), float(scores[i])) for i in top
+        ]
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict | None = None, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def get(self, where: dict | None = None, include: list[str] | None = None) -> dict:
+        """Chroma-style get(): ids plus the requested "documents"/"metadatas" of matching chunks."""
+        include = ["documents", "metadatas"] if include is None else include
+        with self._lock:
+            self._load()
+            mask = self._mask(where)
+            docs = [d for row, d in enumerate(self._docs) if mask is None or mask[row]]
+        result = {"ids": [d["id"] for d in docs]}
+        if "documents" in include:
+            result["documents"] = [d["text"] for d in docs]
+        if "metadatas" in include:
+            result["metadatas"] = [d["metadata"] for d in docs]
+        return result
+
+    def delete(self, ids: list[str] | None = None, **kwargs: Any) -> bool:
+        """Remove chunks by id, rewriting the store without them."""
+        if not ids:
+            return False
+        drop = set(ids)
+        with self._lock:
+            self._load()
+            keep = np.fromiter((d["id"] not in drop for d in self._docs), dtype=bool, count=len(self._docs))
+            if keep.all():
+                return False
+            matrix, scales = self._matrix()
+            self._write_atomic(self._vectors_path, np.ascontiguousarray(matrix[keep]).tobytes())
+            if scales is not None:
+                self._write_atomic(self._scales_path, np.ascontiguousarray(scales[keep]).tobytes())
+            self._docs = [d for d, k in zip(self._docs, keep) if k]
+            data = "".join(json.dumps(d) + "\n" for d in self._docs).encode("utf-8")
+            self._write_atomic(self._docs_path, data)
+            self._docs_bytes = len(data)
+            self._mmap = self._scales = None
+        return True
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_texts(
+        cls, texts: list[str], embedding: Embeddings, metadatas: list[dict] | None = None, *, path: str, **kwargs: Any
+    ) -> "NumpyVectorStore":
+        store = cls(path, embedding)
+        store.add_texts(texts, metadatas=metadatas)
+        return store
@@ -1,8 +1,21 @@
-"""OCR service for scanned PDFs and images using Tesseract."""
+"""OCR service for scanned PDFs and images using Tesseract.
 
-import io
+PDF pages are rasterized one at a time and OCR'd on a bounded process pool.
+Each page is first read at a low DPI and re-read at full resolution only when
+Tesseract's confidence is low. Results are cached per page under the
+document's content hash.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from PIL import Image
 
+from app.core.config import settings
+from app.services.pdf_pages import read_cached_page, write_cached_page
+from app.utils.hashing import file_sha256
+
 try:
     import pytesseract
     TESSERACT_AVAILABLE = True
@@ -15,25 +28,97 @@ try:
 except ImportError:
     PDF2IMAGE_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
 
 def is_ocr_available() -> bool:
     return TESSERACT_AVAILABLE and PDF2IMAGE_AVAILABLE
 
 
-def ocr_pdf(file_path: str) -> str:
-    """Extract text from a scanned PDF using OCR."""
-    if not is_ocr_available():
-        return ""
+def _init_worker() -> None:
+    # Parallelism comes from the pool; stop each tesseract from spawning its own threads
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.OCR_WORKERS, initializer=_init_worker)
+        return _pool
 
-    pages = convert_from_path(file_path, dpi=300)
-    text_parts = []
 
-    for i, page_img in enumerate(pages):
-        text = pytesseract.image_to_string(page_img)
-        if text.strip():
-            text_parts.append(f"--- Page {i + 1} ---\n{text.strip()}")
+def _ocr_with_confidence(img: Image.Image) -> tuple[str, float]:
+    """OCR an image, returning its text and the mean word confidence (0-100)."""
+    data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT)
+    lines: dict[tuple, list[str]] = {}
+    confidences = []
+    for i, word in enumerate(data["text"]):
+        conf = float(data["conf"][i])
+        if conf < 0 or not word.strip():
+            continue
+        confidences.append(conf)
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+
+    text_parts, last_par = [], None
+    for (block, par, _), words in lines.items():
+        if last_par is not None and (block, par) != last_par:
+            text_parts.append("")
+        text_parts.append(" ".join(words))
+        last_par = (block, par)
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return "\n".join(text_parts), confidence
+
+
+def _ocr_page(file_path: str, page: int) -> str:
+    """OCR one 0-based PDF page, escalating to a higher DPI only for low-confidence output."""
+    best_text, best_conf = "", -1.0
+    for dpi in sorted({settings.OCR_BASE_DPI, settings.OCR_MAX_DPI}):
+        images = convert_from_path(file_path, dpi=dpi, first_page=page + 1, last_page=page + 1)
+        if not images:
+            break
+        text, conf = _ocr_with_confidence(images[0])
+        images[0].close()
+        if conf > best_conf:
+            best_text, best_conf = text, conf
+        if conf >= settings.OCR_MIN_CONFIDENCE:
+            break
+    return best_text.strip()
+
+
+def ocr_pdf_pages(file_path: str, pages: list[int]) -> dict[int, str]:
+    """OCR selected pages (0-based) of a PDF. Cached pages are not re-OCR'd."""
+    if not is_ocr_available():
+        return {}
+
+    doc_hash = file_sha256(file_path)
+    results = {}
+    missing = []
+    for page in pages:
+        cached = read_cached_page(doc_hash, page, kind="ocr")
+        if cached is None:
+            missing.append(page)
+        else:
+            results[page] = cached
 
-    return "\n\n".join(text_parts)
+    if len(missing) == 1 or settings.OCR_WORKERS <= 1:
+        for page in missing:
+            results[page] = _ocr_page(file_path, page)
+            write_cached_page(doc_hash, page, results[page], kind="ocr")
+    elif missing:
+        pool = _get_pool()
+        futures = {pool.submit(_ocr_page, file_path, page): page for page in missing}
+        for future in as_completed(futures):
+            page = futures[future]
+            results[page] = future.result()
+            write_cached_page(doc_hash, page, results[page], kind="ocr")
+    if missing:
+        logger.info(f"OCR'd {len(missing)} pages of {file_path}")
+    return results
 
 
 def ocr_image(file_path: str) -> str:
@@ -45,10 +130,6 @@ def ocr_image(file_path: str) -> str:
     return pytesseract.image_to_string(img)
 
 
-def needs_ocr(file_path: str, extracted_text: str) -> bool:
-    """Check if a PDF likely needs OCR (very little text extracted normally)."""
-    if not file_path.lower().endswith(".pdf"):
-        return False
-    # If normal extraction got very little text, try OCR
-    stripped = extracted_text.strip()
-    return len(stripped) < 50
+def page_needs_ocr(page_text: str) -> bool:
+    """A page with almost no extractable text is probably a scanned image."""
+    return len(page_text.strip()) < 50
@@ -0,0 +1,114 @@
+"""Page-level PDF text extraction with a persistent per-page cache.
+
+Pages are extracted in contiguous ranges on a process pool. Each page's text
+is stored under the document's content hash, so later requests (and
+re-uploads of the same file) read cached text instead of re-parsing the PDF.
+"""
+
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from pypdf import PdfReader
+
+from app.core.config import settings
+from app.utils.hashing import file_sha256
+
+logger = logging.getLogger(__name__)
+
+# Below this many uncached pages the pool's start-up cost outweighs the speed-up
+PARALLEL_MIN_PAGES = 16
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.PDF_WORKERS)
+        return _pool
+
+
+def _doc_dir(doc_hash: str) -> str:
+    return os.path.join(settings.PAGE_CACHE_DIR, doc_hash[:2], doc_hash)
+
+
+def read_cached_page(doc_hash: str, page: int, kind: str = "text") -> str | None:
+    path = os.path.join(_doc_dir(doc_hash), f"{kind}-{page:05d}.txt")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_cached_page(doc_hash: str, page: int, text: str, kind: str = "text") -> None:
+    doc_dir = _doc_dir(doc_hash)
+    os.makedirs(doc_dir, exist_ok=True)
+    path = os.path.join(doc_dir, f"{kind}-{page:05d}.txt")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def page_count(file_path: str, doc_hash: str | None = None) -> int:
+    doc_hash = doc_hash or file_sha256(file_path)
+    meta_path = os.path.join(_doc_dir(doc_hash), "meta.json")
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)["pages"]
+    except FileNotFoundError:
+        pass
+    count = len(PdfReader(file_path).pages)
+    os.makedirs(_doc_dir(doc_hash), exist_ok=True)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"pages": count}, f)
+    return count
+
+
+def _extract_range(file_path: str, start: int, stop: int) -> list[str]:
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _page_ranges(pages: list[int], max_len: int) -> list[tuple[int, int]]:
+    """Group sorted page numbers into contiguous [start, stop) ranges of at most max_len pages."""
+    ranges = []
+    for page in pages:
+        if ranges and ranges[-1][1] == page and ranges[-1][1] - ranges[-1][0] < max_len:
+            ranges[-1] = (ranges[-1][0], page + 1)
+        else:
+            ranges.append((page, page + 1))
+    return ranges
+
+
+def extract_pdf_pages(file_path: str) -> list[str]:
+    """Text of every page, in order. Uncached pages are extracted in parallel and cached."""
+    doc_hash = file_sha256(file_path)
+    texts = [read_cached_page(doc_hash, i) for i in range(page_count(file_path, doc_hash))]
+    missing = [i for i, text in enumerate(texts) if text is None]
+    if not missing:
+        return texts
+
+    if len(missing) < PARALLEL_MIN_PAGES or settings.PDF_WORKERS <= 1:
+        ranges = _page_ranges(missing, len(missing))
+        results = [_extract_range(file_path, start, stop) for start, stop in ranges]
+    else:
+        # A few ranges per worker keeps the pool busy when page costs are uneven
+        range_len = max(1, -(-len(missing) // (settings.PDF_WORKERS * 4)))
+        ranges = _page_ranges(missing, range_len)
+        pool = _get_pool()
+        futures = [pool.submit(_extract_range, file_path, start, stop) for start, stop in ranges]
+        results = [f.result() for f in futures]
+
+    for (start, stop), chunk in zip(ranges, results):
+        for page, text in zip(range(start, stop), chunk):
+            texts[page] = text
+            write_cached_page(doc_hash, page, text)
+    logger.info(f"Extracted {len(missing)} uncached pages from {file_path}")
+    return texts
@@ -0,0 +1,81 @@
+"""In-process caches for chat retrieval.
+
+Users ask the same few questions about a file over and over. Question
+embeddings are cached by (model, normalized question), and retrieval results
+by (vector_id, vector version, retrieval mode, k, normalized question).
+invalidate_vectors() bumps a vector id's version whenever its chunks change,
+so stale results are never served and are dropped right away.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_question(text: str) -> str:
+    """Case, whitespace and trailing punctuation don't change what is being asked."""
+    return " ".join(text.lower().split()).rstrip("?!. ")
+
+
+class LRUCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def drop(self, predicate) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+query_embedding_cache = LRUCache(settings.QUERY_EMBEDDING_CACHE_SIZE)
+retrieval_cache = LRUCache(settings.RETRIEVAL_CACHE_SIZE)
+
+_versions: dict[str, int] = {}
+_versions_lock = threading.Lock()
+
+
+def vector_version(vector_id: str) -> int:
+    with _versions_lock:
+        return _versions.get(vector_id, 0)
+
+
+def invalidate_vectors(vector_id: str) -> None:
+    """Call after any write to vector_id's chunks (ingest, re-index, delete)."""
+    with _versions_lock:
+        _versions[vector_id] = _versions.get(vector_id, 0) + 1
+    retrieval_cache.drop(lambda key: key[0] == vector_id)
@@ -0,0 +1,240 @@
+"""Detect CSV reader configuration (encoding, delimiter, header, number format) once per file.
+
+The configuration is sniffed from the first few MB while the upload streams
+to disk, stored on the file record under "reader_config", and passed straight
+to pd.read_csv by every reader, so a non-UTF-8 file is never parsed twice.
+A file whose encoding changes after the sniffed sample is re-detected from
+the whole file on the first read that fails to decode (see read_csv).
+"""
+
+import codecs
+import csv
+import logging
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+from app.core.database import files_table, File
+
+logger = logging.getLogger(__name__)
+
+SNIFF_BYTES = 4 * 1024 * 1024
+SNIFF_LINES = 200
+
+# What pandas itself writes (e.g. after /refine rewrites a file)
+DEFAULT_READER_CONFIG = {"encoding": "utf-8", "sep": ",", "header": 0, "decimal": ".", "thousands": None}
+
+MAX_CONFIGS = 4096  # in-memory memo only; every config is also on its file record
+
+_configs: OrderedDict[str, dict] = OrderedDict()
+_lock = threading.Lock()
+
+_COMMA_DECIMAL = re.compile(r"^-?\d+,\d+$")
+_DOT_THOUSANDS_COMMA_DECIMAL = re.compile(r"^-?\d{1,3}(\.\d{3})+(,\d+)?$")
+_COMMA_THOUSANDS = re.compile(r"^-?\d{1,3}(,\d{3})+(\.\d+)?$")
+_NUMBER = re.compile(r"^-?[\d.,]+$")
+
+
+def detect_encoding(sample: bytes) -> str:
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        # Incremental decode tolerates a multi-byte character cut off at the end of the sample
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        sample.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin1"
+
+
+def _detect_file_encoding(file_path: str) -> str:
+    """detect_encoding over the whole file, for when the first SNIFF_BYTES were misleading."""
+    candidates = ["utf-8", "cp1252"]
+    decoders = {name: codecs.getincrementaldecoder(name)() for name in candidates}
+    with open(file_path, "rb") as f:
+        head = f.read(len(codecs.BOM_UTF8))
+        if head.startswith((codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return detect_encoding(head)
+        f.seek(0)
+        while block := f.read(SNIFF_BYTES):
+            for name in list(candidates):
+                try:
+                    decoders[name].decode(block)
+                except UnicodeDecodeError:
+                    candidates.remove(name)
+            if not candidates:
+                return "latin1"
+    return candidates[0]
+
+
+def _detect_delimiter(lines: list[str]) -> str:
+    """Pick the delimiter that splits the most lines into the same number of fields.
+
+    csv.Sniffer is easily misled by decimal commas and preamble lines, so consistency
+    across lines is scored directly.
+    """
+    best, best_score = ",", (0.0, 0)
+    for delimiter in ",;\t|":
+        widths = [len(row) for row in csv.reader(lines, delimiter=delimiter)]
+        multi = [w for w in widths if w > 1]
+        if not multi:
+            continue
+        mode = max(set(multi), key=multi.count)
+        score = (multi.count(mode) / len(widths), mode)
+        if score > best_score:
+            best, best_score = delimiter, score
+    return best
+
+
+def _detect_number_format(rows: list[list[str]]) -> tuple[str, str | None]:
+    """Return (decimal, thousands) separators from the numeric-looking fields."""
+    comma_decimal = dot_thousands = comma_thousands = 0
+    for row in rows:
+        for value in row:
+            value = value.strip()
+            if not value or not _NUMBER.match(value):
+                continue
+            if _DOT_THOUSANDS_COMMA_DECIMAL.match(value) and "," in value:
+                dot_thousands += 1
+            elif _COMMA_DECIMAL.match(value):
+                comma_decimal += 1
+            elif _COMMA_THOUSANDS.match(value):
+                comma_thousands += 1
+    if comma_decimal + dot_thousands > comma_thousands:
+        return ",", ("." if dot_thousands else None)
+    return ".", ("," if comma_thousands else None)
+
+
+def _detect_header_row(rows: list[list[str]]) -> int:
+    """Skip preamble lines (titles, export banners) above the real header."""
+    widths = [len(r) for r in rows if r]
+    if not widths:
+        return 0
+    table_width = max(set(widths), key=widths.count)
+    for i, row in enumerate(rows):
+        if len(row) == table_width:
+            return i
+    return 0
+
+
+def sniff_reader_config(sample: bytes) -> dict:
+    encoding = detect_encoding(sample)
+    text = sample.decode(encoding, errors="ignore")
+    lines = text.splitlines()
+    if len(sample) >= SNIFF_BYTES and len(lines) > 1:
+        lines = lines[:-1]  # last line is probably truncated
+    lines = lines[:SNIFF_LINES]
+    if not lines:
+        return {**DEFAULT_READER_CONFIG, "encoding": encoding}
+
+    snippet = "\n".join(lines)
+    sep = _detect_delimiter(lines)
+    rows = list(csv.reader(lines, delimiter=sep))
+
+    header = _detect_header_row(rows)
+    # Only drop the header when the first row is plainly data (all numeric)
+    first = [v.strip() for v in rows[header]] if rows else []
+    if first and all(_NUMBER.match(v) for v in first if v) and any(first):
+        try:
+            if not csv.Sniffer().has_header(snippet):
+                header = None
+        except csv.Error:
+            pass
+
+    body = rows[header + 1:] if header is not None else rows
+    decimal, thousands = _detect_number_format(body)
+    if decimal == sep:
+        decimal, thousands = ".", None
+
+    return {"encoding": encoding, "sep": sep, "header": header, "decimal": decimal, "thousands": thousands}
+
+
+def remember_reader_config(file_id: str, config: dict, persist: bool = False) -> None:
+    with _lock:
+        _configs[file_id] = config
+        _configs.move_to_end(file_id)
+        while len(_configs) > MAX_CONFIGS:
+            _configs.popitem(last=False)
+    if persist:
+        files_table.update({"reader_config": config}, File.file_id == file_id)
+
+
+def reset_reader_config(file_id: str) -> None:
+    """Call after rewriting a file with DataFrame.to_csv()."""
+    remember_reader_config(file_id, dict(DEFAULT_READER_CONFIG), persist=True)
+
+
+def get_reader_config(file_path: str) -> dict:
+    """pd.read_csv keyword arguments for file_path."""
+    file_id = Path(file_path).stem
+    with _lock:
+        config = _configs.get(file_id)
+        if config is not None:
+            _configs.move_to_end(file_id)
+            return config
+
+    doc = files_table.get(File.file_id == file_id)
+    config = doc.get("reader_config") if doc else None
+    if config is None:
+        # Uploaded before sniffing existed: sniff once and store it on the record
+        with open(file_path, "rb") as f:
+            config = sniff_reader_config(f.read(SNIFF_BYTES))
+        logger.info(f"Sniffed reader config for legacy file {file_id}: {config}")
+        remember_reader_config(file_id, config, persist=doc is not None)
+        return config
+    remember_reader_config(file_id, config)
+    return config
+
+
+def _redetect_encoding(file_path: str) -> dict:
+    """Re-detect the encoding from the whole file and store the corrected config."""
+    config = get_reader_config(file_path)
+    encoding = _detect_file_encoding(file_path)
+    if encoding == config["encoding"]:
+        # Valid in the detected encoding after all; latin1 decodes any byte sequence
+        encoding = "latin1"
+    logger.warning(f"{file_path} is not {config['encoding']} beyond the sniffed sample; reading it as {encoding}")
+    config = {**config, "encoding": encoding}
+    remember_reader_config(Path(file_path).stem, config, persist=True)
+    return config
+
+
+def _read_csv_chunks(file_path: str, kwargs: dict):
+    done = 0
+    try:
+        for chunk in pd.read_csv(file_path, **{**get_reader_config(file_path), **kwargs}):
+            done += len(chunk)
+            yield chunk
+        return
+    except UnicodeDecodeError:
+        config = _redetect_encoding(file_path)
+    # Start over in the corrected encoding, skipping the rows already yielded
+    seen = 0
+    for chunk in pd.read_csv(file_path, **{**config, **kwargs}):
+        if seen + len(chunk) > done:
+            yield chunk.iloc[max(done - seen, 0):]
+        seen += len(chunk)
+
+
+def read_csv(file_path: str, **kwargs):
+    """pd.read_csv using the encoding/dialect detected for this file at upload.
+
+    The encoding is sniffed from the first SNIFF_BYTES only. If a later byte does
+    not decode, the encoding is re-detected from the whole file, stored on the
+    record, and the read retried. With chunksize, this returns a generator of chunks.
+    """
+    if kwargs.get("chunksize"):
+        return _read_csv_chunks(file_path, kwargs)
+    try:
+        return pd.read_csv(file_path, **{**get_reader_config(file_path), **kwargs})
+    except UnicodeDecodeError:
+        return pd.read_csv(file_path, **{**_redetect_encoding(file_path), **kwargs})
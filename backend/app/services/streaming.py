@@ -0,0 +1,227 @@
+"""Out-of-core ingestion for CSV files that are too large to load eagerly.
+
+The file is read in row chunks. Each chunk updates exact per-column
+aggregates (counts, nulls, sums, min/max) plus pairwise covariance
+sufficient statistics, and feeds a fixed-size reservoir sample. The full
+frame is never materialized.
+"""
+
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.sniffer import read_csv
+
+logger = logging.getLogger(__name__)
+
+
+def is_out_of_core(file_path: str) -> bool:
+    """Whether file_path should be profiled in chunks instead of loaded whole."""
+    if Path(file_path).suffix.lower() != ".csv":
+        return False
+    try:
+        return os.path.getsize(file_path) > settings.OUT_OF_CORE_THRESHOLD_MB * 1024 * 1024
+    except OSError:
+        return False
+
+
+@dataclass
+class TabularProfile:
+    columns: list[str]
+    row_count: int = 0
+    null_counts: dict[str, int] = field(default_factory=dict)
+    numeric_columns: list[str] = field(default_factory=list)
+    sums: dict[str, float] = field(default_factory=dict)
+    mins: dict[str, float] = field(default_factory=dict)
+    maxs: dict[str, float] = field(default_factory=dict)
+    # Pairwise-complete sufficient statistics over numeric_columns. Values are shifted by
+    # the first chunk's column means for numerical stability (moments are shift-invariant):
+    # pair_n[i, j] rows where both i and j are present, pair_sum[i, j] sum of x_i over those
+    # rows, pair_sumsq[i, j] sum of x_i^2 over those rows, cross[i, j] sum of x_i * x_j.
+    pair_n: np.ndarray | None = None
+    pair_sum: np.ndarray | None = None
+    pair_sumsq: np.ndarray | None = None
+    cross: np.ndarray | None = None
+    sample: pd.DataFrame | None = None
+
+    def non_null_count(self, col: str) -> int:
+        return self.row_count - self.null_counts.get(col, 0)
+
+    def mean(self, col: str) -> float | None:
+        count = self.non_null_count(col)
+        if col not in self.sums or count == 0:
+            return None
+        return self.sums[col] / count
+
+    def variance(self, col: str) -> float | None:
+        """Sample variance (ddof=1), matching Series.var()."""
+        if col not in self.numeric_columns:
+            return None
+        i = self.numeric_columns.index(col)
+        n = self.pair_n[i, i]
+        if n < 2:
+            return None
+        return float((self.pair_sumsq[i, i] - self.pair_sum[i, i] ** 2 / n) / (n - 1))
+
+    def correlation_matrix(self) -> pd.DataFrame:
+        """Pearson correlations with pairwise-complete rows, matching DataFrame.corr()."""
+        cols = self.numeric_columns
+        if not cols:
+            return pd.DataFrame()
+        n = self.pair_n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = self.cross - self.pair_sum * self.pair_sum.T / n
+            var_i = self.pair_sumsq - self.pair_sum ** 2 / n
+            corr = cov / np.sqrt(var_i * var_i.T)
+        corr[n < 2] = np.nan
+        return pd.DataFrame(np.clip(corr, -1.0, 1.0), index=cols, columns=cols)
+
+    def to_text(self) -> str:
+        """Compact textual digest used in place of the full-table rendering."""
+        lines = [
+            f"Columns: {', '.join(self.columns)}",
+            f"Rows: {self.row_count} (profiled out-of-core, {len(self.sample)} sampled)",
+            "",
+        ]
+        for col in self.numeric_columns:
+            lines.append(
+                f"{col}: sum={self.sums[col]:.6g}, mean={self.mean(col) or 0:.6g}, "
+                f"min={self.mins[col]:.6g}, max={self.maxs[col]:.6g}, nulls={self.null_counts[col]}"
+            )
+        lines.append("")
+        lines.append(self.sample.to_string(max_rows=200))
+        return "\n".join(lines)
+
+
+class _ProfileBuilder:
+    def __init__(self, sample_size: int, seed: int = 42):
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        self.profile: TabularProfile | None = None
+        self.shift: np.ndarray | None = None
+        self.reservoir: pd.DataFrame | None = None
+
+    def _init(self, chunk: pd.DataFrame) -> None:
+        columns = [str(c) for c in chunk.columns]
+        numeric = [str(c) for c in chunk.select_dtypes(include=[np.number]).columns]
+        k = len(numeric)
+        self.profile = TabularProfile(
+            columns=columns,
+            null_counts={c: 0 for c in columns},
+            numeric_columns=numeric,
+            sums={c: 0.0 for c in numeric},
+            mins={c: np.inf for c in numeric},
+            maxs={c: -np.inf for c in numeric},
+            pair_n=np.zeros((k, k)),
+            pair_sum=np.zeros((k, k)),
+            pair_sumsq=np.zeros((k, k)),
+            cross=np.zeros((k, k)),
+        )
+        self.shift = np.nan_to_num(chunk[numeric].mean().to_numpy(dtype=float)) if k else np.zeros(0)
+
+    def _drop_numeric(self, col: str) -> None:
+        """A column that stopped parsing as numeric in a later chunk loses its numeric stats."""
+        p = self.profile
+        i = p.numeric_columns.index(col)
+        keep = [j for j in range(len(p.numeric_columns)) if j != i]
+        for name in ("pair_n", "pair_sum", "pair_sumsq", "cross"):
+            setattr(p, name, getattr(p, name)[np.ix_(keep, keep)])
+        self.shift = self.shift[keep]
+        p.numeric_columns.remove(col)
+        for stats in (p.sums, p.mins, p.maxs):
+            stats.pop(col, None)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        chunk.columns = [str(c) for c in chunk.columns]
+        if self.profile is None:
+            self._init(chunk)
+        p = self.profile
+        start = p.row_count
+
+        for col, nulls in chunk.isna().sum().items():
+            p.null_counts[col] = p.null_counts.get(col, 0) + int(nulls)
+        for col in [c for c in p.numeric_columns if not pd.api.types.is_numeric_dtype(chunk[c])]:
+            self._drop_numeric(col)
+
+        if p.numeric_columns:
+            values = chunk[p.numeric_columns].to_numpy(dtype=float)
+            present = ~np.isnan(values)
+            mask = present.astype(float)
+            shifted = np.where(present, values - self.shift, 0.0)
+            p.pair_n += mask.T @ mask
+            p.pair_sum += shifted.T @ mask
+            p.pair_sumsq += (shifted ** 2).T @ mask
+            p.cross += shifted.T @ shifted
+            for i, col in enumerate(p.numeric_columns):
+                col_values = values[present[:, i], i]
+                if col_values.size:
+                    p.sums[col] += float(col_values.sum())
+                    p.mins[col] = min(p.mins[col], float(col_values.min()))
+                    p.maxs[col] = max(p.maxs[col], float(col_values.max()))
+
+        self._sample(chunk, start)
+        p.row_count += len(chunk)
+
+    def _sample(self, chunk: pd.DataFrame, start: int) -> None:
+        """Vectorized Algorithm R: row t replaces a random slot with probability k / (t + 1)."""
+        k = self.sample_size
+        positions = np.arange(start, start + len(chunk))
+        slots = np.where(positions < k, positions, self.rng.integers(0, positions + 1))
+        accepted = slots < k
+        if not accepted.any():
+            return
+        rows = chunk.iloc[np.flatnonzero(accepted)].copy()
+        rows.index = positions[accepted]
+        rows["_slot"] = slots[accepted]
+        # Later rows win when several land on the same slot, as in the sequential algorithm
+        rows = rows.drop_duplicates(subset="_slot", keep="last")
+        if self.reservoir is None:
+            self.reservoir = rows
+        else:
+            kept = self.reservoir[~self.reservoir["_slot"].isin(rows["_slot"])]
+            self.reservoir = pd.concat([kept, rows])
+
+    def finish(self) -> TabularProfile:
+        p = self.profile
+        p.sample = self.reservoir.sort_index().drop(columns="_slot")
+        for col in p.numeric_columns:
+            if p.non_null_count(col) == 0:
+                p.mins[col] = p.maxs[col] = float("nan")
+        return p
+
+
+def _build_profile(file_path: str) -> TabularProfile:
+    builder = _ProfileBuilder(settings.RESERVOIR_SAMPLE_ROWS)
+    for chunk in read_csv(file_path, chunksize=settings.STREAM_CHUNK_ROWS):
+        builder.update(chunk)
+    if builder.profile is None:
+        raise ValueError("CSV file contains no rows")
+    return builder.finish()
+
+
+_profiles: dict[tuple[str, int, int], TabularProfile] = {}
+_profiles_lock = threading.Lock()
+
+
+def profile_csv(file_path: str) -> TabularProfile:
+    """Profile a CSV in one streaming pass. Results are memoized per (path, mtime, size)."""
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_mtime_ns, stat.st_size)
+    with _profiles_lock:
+        if key in _profiles:
+            return _profiles[key]
+
+    profile = _build_profile(file_path)
+    logger.info(f"Profiled {file_path} out-of-core: {profile.row_count} rows")
+
+    with _profiles_lock:
+        for stale in [k for k in _profiles if k[0] == file_path]:
+            del _profiles[stale]
+        _profiles[key] = profile
+    return profile
@@ -0,0 +1,179 @@
+"""Table-aware chunks for CSV and Excel files.
+
+Every row of a table is indexed. Rows are rendered as compact pipe-separated
+lines and packed into row-group chunks up to CHUNK_SIZE characters, each
+repeating the table name and header so it stands on its own.
+Next to them go an overview chunk, one chunk per column (statistics or top
+values), and per-category aggregate chunks (count, sum and mean of the
+numeric columns for every value of each low-cardinality column). Rendering
+and aggregation are column-wise pandas operations, with no Python loop per row.
+"""
+
+import logging
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.file_parser import extract_sheets, get_file_extension, read_csv
+from app.services.streaming import is_out_of_core, profile_csv
+
+logger = logging.getLogger(__name__)
+
+TABLE_EXTENSIONS = {".csv", ".xlsx", ".xls"}
+
+CATEGORY_MAX_VALUES = 50  # columns with more distinct values get no per-category chunks
+CATEGORY_MAX_MEASURES = 8  # numeric columns aggregated per category
+TOP_VALUES = 10
+
+
+def _fmt(value) -> str:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    if isinstance(value, (float, np.floating)):
+        if float(value).is_integer():
+            return f"{int(value)}"
+        return f"{value:.2f}" if abs(value) >= 0.01 else f"{value:.4g}"
+    return str(value)
+
+
+def _pack_lines(title: str, lines: list[str], max_chars: int) -> list[str]:
+    """Pack lines into chunks of at most max_chars (a single long line may exceed it), each starting with title."""
+    chunks, current, size = [], [], len(title)
+    for line in lines:
+        if current and size + len(line) + 1 > max_chars:
+            chunks.append("\n".join([title, *current]))
+            current, size = [], len(title)
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append("\n".join([title, *current]))
+    return chunks
+
+
+def _render_rows(df: pd.DataFrame) -> pd.Series:
+    """One 'v1 | v2 | ...' line per row, built column-wise."""
+    cells = df.astype("string").fillna("")
+    cells = cells.apply(lambda s: s.str.replace(r"\s+", " ", regex=True))
+    if cells.shape[1] == 1:
+        return cells.iloc[:, 0]
+    return cells.iloc[:, 0].str.cat([cells[c] for c in cells.columns[1:]], sep=" | ")
+
+
+def row_group_chunks(df: pd.DataFrame, name: str, max_chars: int | None = None) -> list[str]:
+    """Row-group chunks of about max_chars, each repeating the table name and header.
+
+    Groups end after rows whose content hash hits a target rate (or when a group
+    fills up), not at fixed positions, so inserting or deleting a row changes
+    only the groups around it and re-indexing embeds just those.
+    """
+    if df.empty:
+        return []
+    max_chars = max_chars or settings.CHUNK_SIZE
+    header = " | ".join(map(str, df.columns))
+    rendered = _render_rows(df)
+    lines = rendered.to_numpy(dtype=object)
+    lengths = rendered.str.len().to_numpy(dtype=np.int64) + 1
+    budget = max(max_chars - len(header) - len(name) - 10, 1)
+
+    # Round the target down to a power of two so small edits don't move every boundary
+    target = 1 << max(int(np.log2(max(budget / max(lengths.mean(), 1.0), 1.0))), 0)
+    cut = pd.util.hash_pandas_object(rendered, index=False).to_numpy() % target == 0
+    segment = np.concatenate(([0], np.cumsum(cut)[:-1]))
+    before = np.cumsum(lengths) - lengths
+    first = np.flatnonzero(np.diff(segment, prepend=-1))
+    offset = before - before[first][segment]
+    groups = segment * (len(lines) + 1) + offset // budget
+    bounds = np.flatnonzero(np.diff(groups)) + 1
+    return [f"Table {name}\n{header}\n" + "\n".join(rows) for rows in np.split(lines, bounds)]
+
+
+def column_chunks(df: pd.DataFrame, name: str) -> list[str]:
+    """One chunk per column: type, nulls, distinct values, then statistics or top values."""
+    nulls = df.isna().sum()
+    distinct = df.nunique()
+    numeric = df.select_dtypes(include="number")
+    stats = numeric.agg(["sum", "mean", "median", "min", "max", "std"]) if not numeric.empty else None
+    chunks = []
+    for col in df.columns:
+        lines = [
+            f"Table {name}, column {col} ({df[col].dtype})",
+            f"{len(df) - int(nulls[col])} values, {int(nulls[col])} nulls, {int(distinct[col])} distinct",
+        ]
+        if stats is not None and col in stats.columns:
+            lines.append(", ".join(f"{stat}={_fmt(stats.at[stat, col])}" for stat in stats.index))
+        else:
+            counts = df[col].value_counts().head(TOP_VALUES)
+            if not counts.empty:
+                lines.append("Top values: " + ", ".join(f"{value} ({n})" for value, n in counts.items()))
+        chunks.append("\n".join(lines))
+    return chunks
+
+
+def category_chunks(df: pd.DataFrame, name: str, max_chars: int | None = None) -> list[str]:
+    """Count, sum and mean of the numeric columns per value of every low-cardinality column."""
+    max_chars = max_chars or settings.CHUNK_SIZE
+    measures = list(df.select_dtypes(include="number").columns[:CATEGORY_MAX_MEASURES])
+    distinct = df.nunique()
+    chunks = []
+    for col in df.select_dtypes(exclude="number").columns:
+        if not 2 <= distinct[col] <= CATEGORY_MAX_VALUES:
+            continue
+        grouped = df.groupby(col, observed=True, sort=False)
+        counts = grouped.size()
+        aggregates = grouped[measures].agg(["sum", "mean"]) if measures else None
+        lines = []
+        for value in counts.sort_values(ascending=False).index:
+            parts = [f"count={int(counts[value])}"]
+            for measure in measures:
+                parts.append(
+                    f"{measure} sum={_fmt(aggregates.at[value, (measure, 'sum')])} "
+                    f"mean={_fmt(aggregates.at[value, (measure, 'mean')])}"
+                )
+            lines.append(f"{col}={value}: " + ", ".join(parts))
+        chunks += _pack_lines(f"Table {name}, totals by {col}", lines, max_chars)
+    return chunks
+
+
+def overview_chunk(df: pd.DataFrame, name: str) -> str:
+    columns = ", ".join(f"{col} ({dtype})" for col, dtype in df.dtypes.items())
+    return f"Table {name}: {len(df)} rows, {len(df.columns)} columns\nColumns: {columns}"
+
+
+def table_chunks(df: pd.DataFrame, name: str) -> list[str]:
+    """Overview, column and category aggregates, then every row in row groups."""
+    return [
+        overview_chunk(df, name),
+        *column_chunks(df, name),
+        *category_chunks(df, name),
+        *row_group_chunks(df, name),
+    ]
+
+
+def _iter_large_csv_chunks(file_path: str, name: str) -> Iterator[list[str]]:
+    """Out-of-core CSVs: aggregates from the streaming profile, then rows batch by batch."""
+    profile = profile_csv(file_path)
+    yield [f"Table {name}: {profile.row_count} rows, {len(profile.columns)} columns\n"
+           f"Columns: {', '.join(profile.columns)}"]
+    yield _pack_lines(f"Table {name}, column statistics", [
+        f"{col}: sum={_fmt(profile.sums[col])}, mean={_fmt(profile.mean(col))}, "
+        f"min={_fmt(profile.mins[col])}, max={_fmt(profile.maxs[col])}, nulls={profile.null_counts[col]}"
+        for col in profile.numeric_columns
+    ], settings.CHUNK_SIZE)
+    for batch in read_csv(file_path, chunksize=settings.STREAM_CHUNK_ROWS):
+        yield row_group_chunks(batch, name)
+
+
+def iter_table_chunks(file_path: str, name: str | None = None) -> Iterator[list[str]]:
+    """Yield a table file's chunks in batches (one per sheet, or per streamed block of a large CSV)."""
+    name = name or Path(file_path).name
+    if get_file_extension(file_path) == ".csv" and is_out_of_core(file_path):
+        yield from _iter_large_csv_chunks(file_path, name)
+        return
+    sheets = extract_sheets(file_path)
+    if not sheets:
+        return
+    for sheet, df in sheets.items():
+        yield table_chunks(df, name if len(sheets) == 1 else f"{name} / {sheet}")
@@ -0,0 +1,70 @@
+"""Process-wide LRU pool of open vectorstore handles.
+
+Opening a Chroma collection starts a persistent client and opens its SQLite
+database, which is too slow to repeat on every chat turn. Handles are kept
+open keyed by vector id, bounded by VECTORSTORE_POOL_SIZE, and dropped after
+VECTORSTORE_POOL_IDLE_SECONDS without use. Dropping only releases the pool's
+reference: nothing is closed explicitly, since a request may still be using
+the handle, and the client goes away once nothing refers to it.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HandlePool:
+    def __init__(self, max_size: int, idle_seconds: float):
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, factory: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], now)
+                self._entries.move_to_end(key)
+                return entry[0]
+
+        # Open outside the lock; a concurrent open of the same key just loses the race
+        handle = factory()
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key][0]
+            self._entries[key] = (handle, now)
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                logger.debug(f"Dropped least recently used vectorstore handle {evicted}")
+        return handle
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _evict_idle(self, now: float) -> None:
+        while self._entries:
+            key, (_, last_used) = next(iter(self._entries.items()))
+            if now - last_used < self.idle_seconds:
+                break
+            self._entries.popitem(last=False)
+            logger.debug(f"Dropped idle vectorstore handle {key}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+vectorstore_pool = HandlePool(settings.VECTORSTORE_POOL_SIZE, settings.VECTORSTORE_POOL_IDLE_SECONDS)
@@ -0,0 +1,49 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+MAX_DIGESTS = 4096  # least recently used digests are forgotten beyond this (they are recomputed on demand)
+
+_digests: OrderedDict[tuple[str, int, int], str] = OrderedDict()
+_lock = threading.Lock()
+
+
+def file_sha256(file_path: str) -> str:
+    """SHA-256 of a file's content, memoized per (path, mtime, size)."""
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if key in _digests:
+            _digests.move_to_end(key)
+            return _digests[key]
+
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _lock:
+        for stale in [k for k in _digests if k[0] == file_path]:
+            del _digests[stale]
+        _remember(key, digest)
+    return digest
+
+
+def _remember(key: tuple[str, int, int], digest: str) -> None:
+    _digests[key] = digest
+    _digests.move_to_end(key)
+    while len(_digests) > MAX_DIGESTS:
+        _digests.popitem(last=False)
+
+
+def remember_file_sha256(file_path: str, digest: str) -> None:
+    """Seed the memo with a digest computed elsewhere (e.g. while an upload streamed)."""
+    stat = os.stat(file_path)
+    with _lock:
+        _remember((file_path, stat.st_mtime_ns, stat.st_size), digest)
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
@@ -0,0 +1,63 @@
+"""Shared setup for the pytest behaviour tests (test_dedup.py, test_jobs.py, ...).
+
+Storage goes to a throwaway directory, chunks are embedded with a deterministic
+fake model, and requests hit the routers directly (no auth, no OpenAI calls).
+Run from backend/: python -m pytest test_dedup.py test_jobs.py test_reindex.py test_chat_log.py
+"""
+
+import os
+import tempfile
+import time
+
+_storage = tempfile.mkdtemp(prefix="kyawzin-tests-")
+for _name in ("UPLOAD_DIR", "VECTORSTORE_DIR", "COLUMNAR_DIR", "EMBEDDING_CACHE_DIR", "PAGE_CACHE_DIR",
+              "LEXICAL_INDEX_DIR", "CHAT_LOG_DIR"):
+    os.environ[_name] = os.path.join(_storage, _name.lower())
+os.environ["VECTORSTORE_BACKEND"] = "numpy"
+os.environ["VECTORSTORE_MODE"] = "per_file"
+os.makedirs(os.environ["UPLOAD_DIR"], exist_ok=True)
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.services import chunker
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app.api.routes import upload, jobs, refine, chat
+
+    chunker._client = DeterministicFakeEmbedding(size=32)
+    app = FastAPI()
+    for module in (upload, jobs, refine, chat):
+        app.include_router(module.router, prefix="/api")
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def wait_for_job(client):
+    def wait(job_id: str, timeout: float = 30.0) -> dict:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = client.get(f"/api/jobs/{job_id}").json()
+            if job["status"] in ("completed", "failed"):
+                return job
+            time.sleep(0.05)
+        raise TimeoutError(f"Job {job_id} did not finish")
+    return wait
+
+
+@pytest.fixture
+def upload_csv(client, wait_for_job):
+    """Upload CSV text; waits for ingestion when a job was started. Returns the upload response."""
+    def upload(filename: str, content: str) -> dict:
+        response = client.post("/api/upload", files={"file": (filename, content.encode("utf-8"), "text/csv")})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        if body.get("job_id"):
+            assert wait_for_job(body["job_id"])["status"] == "completed"
+        return body
+    return upload
@@ -0,0 +1,69 @@
+"""Fold per-file Chroma directories into the shared collection.
+
+Copies every chunk, its stored embedding and metadata from
+VECTORSTORE_DIR/{file_id} into the single collection used by
+VECTORSTORE_MODE=shared, tagging each chunk with its file_id. Nothing is
+re-embedded. Run from the backend directory, then set VECTORSTORE_MODE=shared:
+
+    python migrate_vectorstores.py [--delete]
+
+--delete removes each per-file directory once its chunk count is verified.
+"""
+
+import argparse
+import os
+import shutil
+
+import chromadb
+
+from app.core.config import settings
+from app.services.chunker import SHARED_DIR, SHARED_COLLECTION
+
+BATCH_SIZE = 1000
+
+
+def migrate(delete: bool = False) -> None:
+    shared_client = chromadb.PersistentClient(path=os.path.join(settings.VECTORSTORE_DIR, SHARED_DIR))
+    shared = shared_client.get_or_create_collection(SHARED_COLLECTION)
+
+    migrated = skipped = 0
+    for file_id in sorted(os.listdir(settings.VECTORSTORE_DIR)):
+        path = os.path.join(settings.VECTORSTORE_DIR, file_id)
+        if file_id == SHARED_DIR or not os.path.isdir(path):
+            continue
+        try:
+            source = chromadb.PersistentClient(path=path).get_collection(file_id)
+        except Exception as e:
+            print(f"Skipping {file_id}: {e}")
+            skipped += 1
+            continue
+
+        data = source.get(include=["embeddings", "documents", "metadatas"])
+        ids = data["ids"]
+        for start in range(0, len(ids), BATCH_SIZE):
+            end = start + BATCH_SIZE
+            shared.upsert(
+                # Prefix ids so chunks from different files can never collide
+                ids=[f"{file_id}:{i}" for i in ids[start:end]],
+                embeddings=data["embeddings"][start:end],
+                documents=data["documents"][start:end],
+                metadatas=[{**(m or {}), "file_id": file_id} for m in data["metadatas"][start:end]],
+            )
+
+        copied = len(shared.get(where={"file_id": file_id}, include=[])["ids"])
+        if copied < len(ids):
+            print(f"{file_id}: only {copied} of {len(ids)} chunks found after copy, keeping directory")
+            skipped += 1
+            continue
+        print(f"{file_id}: {len(ids)} chunks")
+        migrated += 1
+        if delete:
+            shutil.rmtree(path)
+
+    print(f"Migrated {migrated} stores, skipped {skipped}. Set VECTORSTORE_MODE=shared to use the shared collection.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delete", action="store_true", help="remove per-file directories after a verified copy")
+    migrate(delete=parser.parse_args().delete)
@@ -0,0 +1,91 @@
+"""Per-session chat logs: O(1) appends, tail reads, legacy migration and session-id validation."""
+
+import os
+import uuid
+
+from app.core.config import settings
+from app.core.database import chats_table, Chat
+from app.services import chat_log
+from app.services.chat import _save_turn
+
+
+def test_append_and_read_tail():
+    session_id = str(uuid.uuid4())
+    for i in range(200):
+        chat_log.append_messages(session_id, [{"role": "user", "content": f"q{i}"}, {"role": "assistant", "content": f"a{i}\nline"}])
+
+    assert chat_log.message_count(session_id) == 400
+    assert chat_log.read_messages(session_id, last=2) == [
+        {"role": "user", "content": "q199"},
+        {"role": "assistant", "content": "a199\nline"},
+    ]
+    assert len(chat_log.read_messages(session_id)) == 400
+    assert chat_log.read_messages(session_id, last=0) == []
+
+
+def test_torn_append_is_ignored():
+    session_id = str(uuid.uuid4())
+    chat_log.append_messages(session_id, [{"role": "user", "content": "first"}])
+    log_path, idx_path = chat_log._paths(session_id)
+    # A crash mid-append: half a log line and half an offset
+    with open(log_path, "ab") as f:
+        f.write(b'{"role": "us')
+    with open(idx_path, "ab") as f:
+        f.write(b"\x01\x02")
+
+    chat_log.append_messages(session_id, [{"role": "user", "content": "second"}])
+    assert chat_log.read_messages(session_id) == [{"role": "user", "content": "first"}, {"role": "user", "content": "second"}]
+
+
+def test_turns_append_and_legacy_sessions_migrate(client):
+    session_id = str(uuid.uuid4())
+    _save_turn(session_id, "file-1", [], "hello", "hi")
+    _save_turn(session_id, "file-1", [], "again", "sure")
+    assert "messages" not in chats_table.get(Chat.session_id == session_id)
+    body = client.get(f"/api/chat/session/{session_id}", params={"last": 1}).json()
+    assert body["messages"] == [{"role": "assistant", "content": "sure"}]
+
+    legacy_id = str(uuid.uuid4())
+    chats_table.insert({
+        "session_id": legacy_id, "file_id": "file-1", "title": "old",
+        "messages": [{"role": "user", "content": "old q"}, {"role": "assistant", "content": "old a"}],
+        "created_at": "2024-01-01T00:00:00+00:00", "updated_at": "2024-01-01T00:00:00+00:00",
+    })
+    _save_turn(legacy_id, "file-1", [], "new q", "new a")
+    assert "messages" not in chats_table.get(Chat.session_id == legacy_id)
+    assert [m["content"] for m in chat_log.read_messages(legacy_id)] == ["old q", "old a", "new q", "new a"]
+
+    assert client.delete(f"/api/chat/session/{session_id}").status_code == 200
+    assert not os.path.exists(chat_log._paths(session_id)[0])
+
+
+def test_turns_do_not_reread_the_session_table(client, monkeypatch):
+    session_id = str(uuid.uuid4())
+    _save_turn(session_id, "file-2", [], "first", "one")
+
+    def no_reads(*args, **kwargs):
+        raise AssertionError("session record read from TinyDB")
+    monkeypatch.setattr(chats_table, "get", no_reads)
+    _save_turn(session_id, "file-2", [], "second", "two")
+    body = client.get(f"/api/chat/session/{session_id}").json()
+    assert [m["content"] for m in body["messages"]] == ["first", "one", "second", "two"]
+    monkeypatch.undo()
+
+    # The sidebar list carries headers only
+    listed = client.get("/api/chat/sessions/file-2").json()
+    assert [(s["session_id"], s["messages"]) for s in listed] == [(session_id, [])]
+
+    assert client.delete(f"/api/chat/session/{session_id}").status_code == 200
+    assert client.get(f"/api/chat/session/{session_id}").status_code == 404
+
+
+def test_session_ids_must_be_uuids(client):
+    escaped = os.path.join(os.path.dirname(settings.CHAT_LOG_DIR), "escaped.jsonl")
+    for bad in ("../escaped", "not-a-uuid", str(uuid.uuid4()).upper()):
+        assert not chat_log.is_valid_session_id(bad)
+        request = {"file_id": "file-1", "question": "hi", "chat_history": [], "session_id": bad}
+        assert client.post("/api/chat", json=request).status_code == 400
+        assert client.post("/api/chat/stream", json=request).status_code == 400
+    assert client.get("/api/chat/session/not-a-uuid").status_code == 400
+    assert client.delete("/api/chat/session/not-a-uuid").status_code == 400
+    assert not os.path.exists(escaped)
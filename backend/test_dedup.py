@@ -0,0 +1,103 @@
+"""Upload dedup: identical uploads share one blob until the last reference goes; refining detaches."""
+
+import hashlib
+import os
+import uuid
+
+from app.core.config import settings
+from app.core.database import files_table, File
+from app.services.blobs import blobs_table, Blob
+from app.services.chunker import open_vectorstore
+from app.services.jobs import create_job, submit_ingestion
+
+CSV = "region,units,price\n" + "".join(f"r{i % 4},{i},{i * 1.5}\n" for i in range(40))
+
+
+def _record(file_id: str) -> dict:
+    return files_table.get(File.file_id == file_id)
+
+
+def test_alias_shares_blob_until_last_delete(client, upload_csv):
+    first = upload_csv("sales.csv", CSV)
+    second = upload_csv("sales-copy.csv", CSV)
+    assert second.get("job_id") is None  # aliased, nothing re-ingested
+
+    original, alias = _record(first["file_id"]), _record(second["file_id"])
+    assert alias["file_path"] == original["file_path"]
+    assert alias["vector_id"] == original["vector_id"]
+    assert sorted(blobs_table.get(Blob.sha256 == original["sha256"])["refs"]) == sorted(
+        [first["file_id"], second["file_id"]]
+    )
+
+    assert client.delete(f"/api/files/{first['file_id']}").status_code == 200
+    assert os.path.exists(original["file_path"])
+    assert blobs_table.get(Blob.sha256 == original["sha256"])["refs"] == [second["file_id"]]
+
+    assert client.delete(f"/api/files/{second['file_id']}").status_code == 200
+    assert not os.path.exists(original["file_path"])
+    assert blobs_table.get(Blob.sha256 == original["sha256"]) is None
+
+
+def test_refining_the_original_leaves_aliases_untouched(client, upload_csv, wait_for_job):
+    content = CSV + "r1,1,1.5\n"  # a duplicate row for refine to drop
+    first = upload_csv("orders.csv", content)
+    second = upload_csv("orders-copy.csv", content)
+    blob_path = _record(first["file_id"])["file_path"]
+    sha256 = _record(first["file_id"])["sha256"]
+
+    response = client.post("/api/refine", json={"file_id": first["file_id"]})
+    assert response.status_code == 200, response.text
+    assert wait_for_job(response.json()["reindex_job_id"])["status"] == "completed"
+
+    refined = _record(first["file_id"])
+    assert refined["file_path"] != blob_path
+    assert refined["sha256"] is None
+    with open(blob_path, encoding="utf-8") as f:
+        assert f.read() == content  # the alias still reads the uploaded bytes
+    assert _record(second["file_id"])["file_path"] == blob_path
+    assert blobs_table.get(Blob.sha256 == sha256)["refs"] == [second["file_id"]]
+
+    # A later identical upload aliases the original content, not the refined file
+    third = upload_csv("orders-again.csv", content)
+    assert _record(third["file_id"])["file_path"] == blob_path
+
+    for file_id in (second["file_id"], third["file_id"]):
+        assert client.delete(f"/api/files/{file_id}").status_code == 200
+    assert not os.path.exists(blob_path)
+    assert os.path.exists(refined["file_path"])
+
+    assert client.delete(f"/api/files/{first['file_id']}").status_code == 200
+    assert not os.path.exists(refined["file_path"])
+
+
+def test_overlapping_identical_uploads_end_up_aliased(client, wait_for_job):
+    # Both uploads are saved before either finishes ingesting, so neither finds a blob
+    content = CSV + "r3,99,9.5\n"
+    sha256 = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    jobs = []
+    for name in ("a.csv", "b.csv"):
+        file_id = str(uuid.uuid4())
+        file_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}.csv")
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        job = create_job(file_id, name)
+        submit_ingestion(job, file_path, sha256)
+        jobs.append((file_id, file_path, job))
+    for _, _, job in jobs:
+        assert wait_for_job(job["job_id"])["status"] == "completed"
+
+    blob = blobs_table.get(Blob.sha256 == sha256)
+    records = [_record(file_id) for file_id, _, _ in jobs]
+    assert sorted(blob["refs"]) == sorted(r["file_id"] for r in records)
+    assert {r["file_path"] for r in records} == {blob["file_path"]}
+    assert {r["vector_id"] for r in records} == {blob["vector_id"]}
+    duplicate = next(path for _, path, _ in jobs if path != blob["file_path"])
+    assert not os.path.exists(duplicate)
+
+    first, second = records
+    assert client.delete(f"/api/files/{first['file_id']}").status_code == 200
+    assert os.path.exists(blob["file_path"])
+    assert open_vectorstore(blob["vector_id"]).get(include=[])["ids"]  # the remaining record still has its vectors
+    assert client.delete(f"/api/files/{second['file_id']}").status_code == 200
+    assert not os.path.exists(blob["file_path"])
+    assert blobs_table.get(Blob.sha256 == sha256) is None
@@ -0,0 +1,70 @@
+"""Ingestion jobs: an upload returns a job id and /jobs/{id} reports per-stage progress to completion."""
+
+import os
+
+from app.core.database import files_table, File
+from app.services.jobs import STAGES, create_job
+from app.services.sniffer import SNIFF_BYTES, read_csv
+
+CSV = "city,visits,spend\n" + "".join(f"c{i % 9},{i},{i * 2.25}\n" for i in range(300))
+
+
+def test_new_job_is_queued_with_pending_stages(client):
+    job = create_job("file-queued", "queued.csv")
+    body = client.get(f"/api/jobs/{job['job_id']}").json()
+    assert body["status"] == "queued"
+    assert body["stages"] == {stage: {"status": "pending", "done": 0, "total": None} for stage in STAGES}
+    assert body["num_chunks"] == 0
+
+
+def test_upload_job_runs_to_completion(client, wait_for_job):
+    response = client.post("/api/upload", files={"file": ("visits.csv", CSV.encode("utf-8"), "text/csv")})
+    assert response.status_code == 200, response.text
+    upload = response.json()
+    assert upload["job_id"]
+
+    job = wait_for_job(upload["job_id"])
+    assert job["status"] == "completed", job["error"]
+    assert job["file_id"] == upload["file_id"]
+    assert job["error"] is None
+    for stage in STAGES:
+        assert job["stages"][stage]["status"] == "completed"
+        assert job["stages"][stage]["done"] == job["stages"][stage]["total"]
+    assert job["stages"]["embed"]["total"] == job["num_chunks"] > 0
+    assert job["embedding_cache_hit_rate"] == 0.0  # nothing embedded before
+    assert job["preview"]
+
+    record = files_table.get(File.file_id == upload["file_id"])
+    assert record["num_chunks"] == job["num_chunks"]
+    assert os.path.exists(record["file_path"])
+
+
+def test_non_utf8_bytes_after_the_sniffed_sample_still_ingest(client, wait_for_job):
+    head = b"name,amount\n" + b"plain,1\n" * (SNIFF_BYTES // 8 + 1)
+    content = head + b"caf\xe9,2\n"  # cp1252 after the first SNIFF_BYTES
+    response = client.post("/api/upload", files={"file": ("late-latin.csv", content, "text/csv")})
+    assert response.status_code == 200, response.text
+    job = wait_for_job(response.json()["job_id"], timeout=120)
+    assert job["status"] == "completed", job["error"]
+
+    record = files_table.get(File.file_id == response.json()["file_id"])
+    assert record["reader_config"]["encoding"] == "cp1252"
+    df = read_csv(record["file_path"])
+    assert len(df) == SNIFF_BYTES // 8 + 2
+    assert df["name"].iloc[-1] == "caf\u00e9"
+
+
+def test_failed_job_reports_error_and_cleans_up(client, wait_for_job):
+    response = client.post("/api/upload", files={"file": ("broken.xlsx", b"not a workbook", "application/octet-stream")})
+    assert response.status_code == 200, response.text
+    upload = response.json()
+
+    job = wait_for_job(upload["job_id"])
+    assert job["status"] == "failed"
+    assert job["error"]
+    assert all(stage["status"] in ("completed", "failed") for stage in job["stages"].values())
+    assert files_table.get(File.file_id == upload["file_id"]) is None
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/api/jobs/does-not-exist").status_code == 404
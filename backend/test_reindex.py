@@ -0,0 +1,48 @@
+"""Incremental re-index: after a file changes, only chunks whose content changed are embedded."""
+
+from pathlib import Path
+
+from app.core.database import files_table, File
+from app.services.chunker import open_vectorstore, sync_vectorstore
+from app.services.embedder import chunk_id
+from app.services.frame_cache import frame_cache
+from app.services.jobs import create_job, submit_reindex
+from app.services.sniffer import reset_reader_config
+
+ROWS = [f"s{i % 7},item-{i},{i * 3},{i % 11}.5\n" for i in range(2000)]
+HEADER = "store,sku,units,price\n"
+
+
+def _stored_ids(vector_id: str) -> set[str]:
+    return set(open_vectorstore(vector_id).get(include=[])["ids"])
+
+
+def test_sync_vectorstore_diffs_by_content():
+    vector_id = "sync-test"
+    assert sync_vectorstore(vector_id, ["a", "b", "c"]) == (3, 0)
+    assert sync_vectorstore(vector_id, ["a", "b", "c"]) == (0, 0)
+    assert sync_vectorstore(vector_id, ["a", "c", "d", "d"]) == (1, 1)
+    assert _stored_ids(vector_id) == {chunk_id(vector_id, chunk) for chunk in ("a", "c", "d")}
+
+
+def test_reindex_job_embeds_only_changed_chunks(client, upload_csv, wait_for_job):
+    upload = upload_csv("inventory.csv", HEADER + "".join(ROWS))
+    doc = files_table.get(File.file_id == upload["file_id"])
+    before = _stored_ids(doc["vector_id"])
+
+    # Rewrite the file in place with three rows removed, as /refine does
+    with open(doc["file_path"], "w", encoding="utf-8") as f:
+        f.write(HEADER + "".join(ROWS[:1000] + ROWS[1003:]))
+    reset_reader_config(Path(doc["file_path"]).stem)
+    frame_cache.invalidate(Path(doc["file_path"]).stem)
+
+    job = create_job(upload["file_id"], "inventory.csv")
+    submit_reindex(job)
+    job = wait_for_job(job["job_id"])
+    assert job["status"] == "completed"
+
+    after = _stored_ids(doc["vector_id"])
+    added = job["stages"]["embed"]["total"]
+    assert 0 < added < len(after) // 10  # aggregates and the row groups around the edit, not the whole file
+    assert len(after - before) == added
+    assert files_table.get(File.file_id == upload["file_id"])["num_chunks"] == job["num_chunks"]
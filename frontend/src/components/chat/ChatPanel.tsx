@@ -3,7 +3,7 @@
 import { useState, useRef, useEffect } from "react";
 import { Send, Loader2, Bot, User, MessageSquarePlus, History, Trash2 } from "lucide-react";
 import { useTranslations, useLocale } from "next-intl";
-import { chatWithFile, getChatSessions, deleteChatSession, type ChatSessionInfo } from "@/lib/api";
+import { streamChat, getChatSessions, getChatSession, deleteChatSession, type ChatSessionInfo } from "@/lib/api";
 import ReactMarkdown from "react-markdown";
 
 interface Message {
@@ -17,6 +17,7 @@ export default function ChatPanel({ fileId }: { fileId: string }) {
   const [messages, setMessages] = useState<Message[]>([]);
   const [input, setInput] = useState("");
   const [loading, setLoading] = useState(false);
+  const [streaming, setStreaming] = useState(false);
   const [sessionId, setSessionId] = useState<string | undefined>();
   const [sessions, setSessions] = useState<ChatSessionInfo[]>([]);
   const [showSessions, setShowSessions] = useState(false);
@@ -39,10 +40,36 @@ export default function ChatPanel({ fileId }: { fileId: string }) {
     setMessages((prev) => [...prev, userMsg]);
     setLoading(true);
 
+    let started = false;
     try {
-      const res = await chatWithFile(fileId, question, messages, sessionId, locale);
+      const res = await streamChat(
+        fileId,
+        question,
+        messages,
+        {
+          // The answer bubble appears with the first token and grows as the rest stream in
+          onToken: (text) => {
+            if (!started) {
+              started = true;
+              setStreaming(true);
+              setMessages((prev) => [...prev, { role: "assistant", content: text }]);
+              return;
+            }
+            setMessages((prev) => {
+              const next = [...prev];
+              const last = next[next.length - 1];
+              next[next.length - 1] = { ...last, content: last.content + text };
+              return next;
+            });
+          },
+        },
+        sessionId,
+        locale
+      );
       setSessionId(res.session_id);
-      setMessages((prev) => [...prev, { role: "assistant", content: res.answer }]);
+      if (!started) {
+        setMessages((prev) => [...prev, { role: "assistant", content: res.answer }]);
+      }
       // Refresh sessions list
       getChatSessions(fileId).then(setSessions).catch(() => { });
     } catch {
@@ -52,6 +79,7 @@ export default function ChatPanel({ fileId }: { fileId: string }) {
       ]);
     } finally {
       setLoading(false);
+      setStreaming(false);
     }
   };
 
@@ -61,9 +89,11 @@ export default function ChatPanel({ fileId }: { fileId: string }) {
     setShowSessions(false);
   };
 
-  const loadSession = (s: ChatSessionInfo) => {
-    setSessionId(s.session_id);
-    setMessages(s.messages.map((m) => ({ role: m.role as "user" | "assistant", content: m.content })));
+  const loadSession = async (s: ChatSessionInfo) => {
+    // The session list carries headers only; fetch the messages when a session is opened
+    const session = await getChatSession(s.session_id);
+    setSessionId(session.session_id);
+    setMessages(session.messages.map((m) => ({ role: m.role as "user" | "assistant", content: m.content })));
     setShowSessions(false);
   };
 
@@ -164,7 +194,7 @@ export default function ChatPanel({ fileId }: { fileId: string }) {
             </div>
           ))}
 
-          {loading && (
+          {loading && !streaming && (
             <div className="flex gap-3">
               <div className="w-8 h-8 rounded-lg bg-primary-600/20 flex items-center justify-center">
                 <Bot className="w-4 h-4 text-primary-400" />
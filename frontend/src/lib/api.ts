@@ -35,6 +35,28 @@ export interface FileUploadResponse {
   file_type: string;
   num_chunks: number;
   preview: string;
+  job_id?: string | null;
+  status?: string;
+  merge_strategy?: "stack" | "join" | "side_by_side" | null;
+  merge_keys?: string[] | null;
+}
+
+export interface JobStage {
+  status: string;
+  done: number;
+  total: number | null;
+}
+
+export interface IngestionJob {
+  job_id: string;
+  file_id: string;
+  filename: string;
+  status: string;
+  stages: Record<string, JobStage>;
+  num_chunks: number;
+  preview: string;
+  embedding_cache_hit_rate: number | null;
+  error: string | null;
 }
 
 export interface FileRecord {
@@ -235,6 +257,22 @@ export async function uploadFile(file: File): Promise<FileUploadResponse> {
   const res = await api.post("/upload", formData, {
     headers: { "Content-Type": "multipart/form-data" },
   });
+  const upload: FileUploadResponse = res.data;
+  if (!upload.job_id) return upload;
+
+  // Ingestion runs in the background; wait for it so callers get a ready file
+  for (;;) {
+    await new Promise((resolve) => setTimeout(resolve, 1000));
+    const job = await getJob(upload.job_id);
+    if (job.status === "failed") throw new Error(job.error || "Upload processing failed");
+    if (job.status === "completed") {
+      return { ...upload, status: job.status, num_chunks: job.num_chunks, preview: job.preview };
+    }
+  }
+}
+
+export async function getJob(jobId: string): Promise<IngestionJob> {
+  const res = await api.get(`/jobs/${jobId}`);
   return res.data;
 }
 
@@ -288,6 +326,7 @@ export interface RefineResponse {
   success: boolean;
   message: string;
   final_rows: number;
+  reindex_job_id?: string;
 }
 
 export async function checkDataQuality(fileId: string): Promise<QAResponse> {
@@ -319,6 +358,77 @@ export async function chatWithFile(
   return res.data;
 }
 
+export interface ChatToolEvent {
+  name: string;
+  status: "started" | "running" | "completed" | "failed";
+  elapsed?: number;
+}
+
+export interface ChatStreamHandlers {
+  onSources?: (sources: string[], sessionId: string) => void;
+  onToken: (text: string) => void;
+  onTool?: (event: ChatToolEvent) => void;
+}
+
+// Server-sent events from /chat/stream; resolves with the full answer once it is saved
+export async function streamChat(
+  fileId: string,
+  question: string,
+  chatHistory: { role: string; content: string }[],
+  handlers: ChatStreamHandlers,
+  sessionId?: string,
+  language?: string
+): Promise<ChatResponse> {
+  const token = typeof window !== "undefined" ? localStorage.getItem("kyawzin_access_token") : null;
+  const res = await fetch("/api/chat/stream", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify({
+      file_id: fileId,
+      question,
+      chat_history: chatHistory,
+      session_id: sessionId || null,
+      language: language || null,
+    }),
+  });
+  if (!res.ok || !res.body) {
+    throw new Error(`Chat stream failed: ${res.status}`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let sources: string[] = [];
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || "{}");
+      if (event === "sources") {
+        sources = data.sources;
+        handlers.onSources?.(data.sources, data.session_id);
+      } else if (event === "token") {
+        handlers.onToken(data.content);
+      } else if (event === "tool") {
+        handlers.onTool?.(data);
+      } else if (event === "done") {
+        return { answer: data.answer, sources, session_id: data.session_id };
+      } else if (event === "error") {
+        throw new Error(data.detail);
+      }
+    }
+  }
+  throw new Error("Chat stream ended unexpectedly");
+}
+
 export async function getChatSessions(fileId: string): Promise<ChatSessionInfo[]> {
   const res = await api.get(`/chat/sessions/${fileId}`);
   return res.data;